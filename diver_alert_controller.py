@@ -1,12 +1,14 @@
 # diver_alert_controller.py
 # Контроллер мультимодального предупреждения дайверов (светлое, звук, вибрация, позиция)
 
+import math
 import time
 import numpy as np
 from dataclasses import dataclass
 import logging
-from typing import Dict, List, Tuple
+from typing import Tuple
 from enum import Enum
+from numba import njit
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("DiverAlertController")
@@ -19,7 +21,7 @@ class AlertMode(Enum):
     HIGH = 3
     CRITICAL = 4
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AlertPattern:
     """Паттерн многомодального предупреждения"""
     light_color: Tuple[int, int, int]      # RGB (0-255)
@@ -27,10 +29,197 @@ class AlertPattern:
     audio_freq_hz: int
     audio_pulse_rate_hz: float
     audio_volume_percent: int
-    haptic_motors: List[float]  # Интенсивность для каждого мотора (0-1)
+    haptic_motors: Tuple[float, float, float]  # Интенсивность для каждого мотора (0-1, в таблице - ШИМ 0-255)
     body_yaw_deg: float
     body_pitch_deg: float
 
+# Паттерны предупреждений для каждого уровня риска
+_ALERT_PATTERNS = {
+    AlertMode.SAFE: AlertPattern(
+        light_color=(0, 255, 0),          # Зелёный
+        light_strobe_hz=0.5,
+        audio_freq_hz=10000,
+        audio_pulse_rate_hz=0.0,          # Постоянный тон
+        audio_volume_percent=0,           # Без звука
+        haptic_motors=(0.0, 0.0, 0.0),
+        body_yaw_deg=0,
+        body_pitch_deg=0
+    ),
+    AlertMode.LOW: AlertPattern(
+        light_color=(0, 255, 0),          # Зелёный
+        light_strobe_hz=1.0,
+        audio_freq_hz=15000,
+        audio_pulse_rate_hz=0.0,          # Постоянный
+        audio_volume_percent=25,
+        haptic_motors=(0.1, 0.0, 0.1),
+        body_yaw_deg=0,
+        body_pitch_deg=0
+    ),
+    AlertMode.MEDIUM: AlertPattern(
+        light_color=(255, 165, 0),        # Янтарный
+        light_strobe_hz=3.0,
+        audio_freq_hz=25000,
+        audio_pulse_rate_hz=5.0,          # 5 Hz пульс
+        audio_volume_percent=60,
+        haptic_motors=(0.3, 0.2, 0.3),
+        body_yaw_deg=45,                  # Поворот указывает на угрозу
+        body_pitch_deg=0
+    ),
+    AlertMode.HIGH: AlertPattern(
+        light_color=(255, 100, 0),        # Красный-оранжевый
+        light_strobe_hz=5.0,
+        audio_freq_hz=35000,
+        audio_pulse_rate_hz=8.0,          # 8 Hz пульс
+        audio_volume_percent=85,
+        haptic_motors=(0.6, 0.4, 0.6),
+        body_yaw_deg=90,                  # Ясное указание направления
+        body_pitch_deg=10
+    ),
+    AlertMode.CRITICAL: AlertPattern(
+        light_color=(255, 0, 0),          # Ярко красный
+        light_strobe_hz=10.0,
+        audio_freq_hz=40000,
+        audio_pulse_rate_hz=10.0,         # 10 Hz быстрый пульс
+        audio_volume_percent=100,
+        haptic_motors=(1.0, 1.0, 1.0),   # Максимум
+        body_yaw_deg=180,                 # Агрессивный поворот
+        body_pitch_deg=20
+    )
+}
+
+# Таблица паттернов (SoA-запись на каждый AlertMode, индекс = AlertMode.value)
+_PATTERN_DTYPE = np.dtype([
+    ('light_color', '3u1'),
+    ('light_strobe_hz', 'f4'),
+    ('audio_freq_hz', 'i4'),
+    ('audio_pulse_rate_hz', 'f4'),
+    ('audio_volume_percent', 'u1'),
+    ('haptic_motors', '3u1'),
+    ('body_yaw_deg', 'f4'),
+    ('body_pitch_deg', 'f4'),
+])
+
+_PATTERN_TABLE = np.zeros(len(AlertMode), dtype=_PATTERN_DTYPE).view(np.recarray)
+for _mode, _pattern in _ALERT_PATTERNS.items():
+    _PATTERN_TABLE[_mode.value] = (
+        _pattern.light_color,
+        _pattern.light_strobe_hz,
+        _pattern.audio_freq_hz,
+        _pattern.audio_pulse_rate_hz,
+        _pattern.audio_volume_percent,
+        np.round(np.asarray(_pattern.haptic_motors) * 255),  # ШИМ 0-255
+        _pattern.body_yaw_deg,
+        _pattern.body_pitch_deg,
+    )
+del _ALERT_PATTERNS, _mode, _pattern
+
+# Уровень риска 0-10 -> индекс AlertMode
+_RISK_TO_MODE = np.array([0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 4], dtype=np.uint8)
+
+# Индекс -> AlertMode без поиска по значению в Enum
+_ALERT_MODES = tuple(AlertMode)
+
+# Азимутные таблицы с шагом 1° (индекс = floor(азимут) % 360)
+_AZIMUTH_DEG = np.arange(360)
+_LED_IDX = ((_AZIMUTH_DEG / 45).astype(int) % 8).astype(np.uint8)
+_SWEEP = ((_AZIMUTH_DEG - 180) / 180 * 100).astype(np.int8)
+
+# Базовое распределение вибрации [левый, центр, правый] по азимуту
+# (отрицательная составляющая - угроза сзади - для ШИМ обнуляется). Хранится
+# без квантования: малая, но ненулевая составляющая после нормализации по
+# максимуму даёт полный импульс, и округление до ШИМ здесь её бы потеряло
+_MOTOR_BASE = np.empty((360, 3), dtype=np.float64)
+_MOTOR_BASE[:, 0] = np.maximum(0, -np.sin(np.radians(_AZIMUTH_DEG)))
+_MOTOR_BASE[:, 1] = np.maximum(0, np.cos(np.radians(_AZIMUTH_DEG)))
+_MOTOR_BASE[:, 2] = np.maximum(0, np.sin(np.radians(_AZIMUTH_DEG)))
+
+
+@njit(cache=True)
+def _haptic_kernel(az_idx, g0, g1, g2, out):
+    """
+    Скважность ШИМ трёх вибромоторов для азимута угрозы
+    
+    Произведения и нормализация - в float, в ШИМ округляется только
+    результат, поэтому ненулевая составляющая направления не теряется.
+    
+    Args:
+        az_idx: Азимут угрозы в целых градусах 0-359
+        g0, g1, g2: ШИМ паттерна для левого, центрального, правого мотора
+        out: Выходной буфер uint8[3] [левый, центр, правый]
+    """
+    base = _MOTOR_BASE[az_idx]
+    p0 = base[0] * g0
+    p1 = base[1] * g1
+    p2 = base[2] * g2
+    
+    # Нормализовать по максимуму и перевести в ШИМ 0-255
+    m = max(p0, p1, p2)
+    if m > 0:
+        k = 255.0 / m
+        p0 = round(p0 * k)
+        p1 = round(p1 * k)
+        p2 = round(p2 * k)
+    
+    out[0] = p0
+    out[1] = p1
+    out[2] = p2
+
+
+# Команда предупреждения по всем четырём модальностям (заполняется ядром)
+_COMMAND_DTYPE = np.dtype([
+    ('light_color', '3u1'),
+    ('light_strobe_hz', 'f4'),
+    ('led_idx', 'u1'),
+    ('audio_freq_hz', 'i4'),
+    ('audio_pulse_rate_hz', 'f4'),
+    ('audio_volume_percent', 'u1'),
+    ('audio_sweep_percent', 'i1'),
+    ('motor_duty', '3u1'),
+    ('body_yaw_deg', 'f4'),
+    ('body_pitch_deg', 'f4'),
+])
+
+
+@njit(cache=True)
+def _dispatch_kernel(mode_idx, az_idx, azimuth, patterns, out):
+    """
+    Вычислить команду предупреждения для всех модальностей
+    
+    Свет, звук, вибрация и корпус считаются в компилированном коде по
+    строке таблицы паттернов и азимутным таблицам; Python-объекты не
+    создаются.
+    
+    Args:
+        mode_idx: Индекс режима (AlertMode.value)
+        az_idx: Азимут угрозы в целых градусах 0-359 (индекс азимутных таблиц)
+        azimuth: Азимут угрозы в градусах (для рыскания корпуса)
+        patterns: Таблица паттернов _PATTERN_TABLE
+        out: Массив _COMMAND_DTYPE из одного элемента
+    """
+    p = patterns[mode_idx]
+    c = out[0]
+    
+    # 1. Свет: цвет/стробо из паттерна, LED направлен на угрозу
+    for i in range(3):
+        c.light_color[i] = p.light_color[i]
+    c.light_strobe_hz = p.light_strobe_hz
+    c.led_idx = _LED_IDX[az_idx]
+    
+    # 2. Звук: тон/пульс/громкость из паттерна, доплеровский свип по азимуту
+    c.audio_freq_hz = p.audio_freq_hz
+    c.audio_pulse_rate_hz = p.audio_pulse_rate_hz
+    c.audio_volume_percent = p.audio_volume_percent
+    c.audio_sweep_percent = _SWEEP[az_idx]
+    
+    # 3. Вибрация: ШИМ моторов по азимуту
+    _haptic_kernel(az_idx, np.int64(p.haptic_motors[0]), np.int64(p.haptic_motors[1]),
+                   np.int64(p.haptic_motors[2]), c.motor_duty)
+    
+    # 4. Корпус: рыскание указывает на азимут угрозы (без округления до бина)
+    c.body_yaw_deg = azimuth
+    c.body_pitch_deg = p.body_pitch_deg
+
+
 class DiverAlertController:
     """
     Мультимодальная система предупреждения дайверов
@@ -42,59 +231,11 @@ class DiverAlertController:
     4. КОРПУС: Физическое позиционирование робота (рыскание/наклон)
     """
     
-    # Паттерны предупреждений для каждого уровня риска
-    ALERT_PATTERNS = {
-        AlertMode.SAFE: AlertPattern(
-            light_color=(0, 255, 0),          # Зелёный
-            light_strobe_hz=0.5,
-            audio_freq_hz=10000,
-            audio_pulse_rate_hz=0.0,          # Постоянный тон
-            audio_volume_percent=0,           # Без звука
-            haptic_motors=[0.0, 0.0, 0.0],
-            body_yaw_deg=0,
-            body_pitch_deg=0
-        ),
-        AlertMode.LOW: AlertPattern(
-            light_color=(0, 255, 0),          # Зелёный
-            light_strobe_hz=1.0,
-            audio_freq_hz=15000,
-            audio_pulse_rate_hz=0.0,          # Постоянный
-            audio_volume_percent=25,
-            haptic_motors=[0.1, 0.0, 0.1],
-            body_yaw_deg=0,
-            body_pitch_deg=0
-        ),
-        AlertMode.MEDIUM: AlertPattern(
-            light_color=(255, 165, 0),        # Янтарный
-            light_strobe_hz=3.0,
-            audio_freq_hz=25000,
-            audio_pulse_rate_hz=5.0,          # 5 Hz пульс
-            audio_volume_percent=60,
-            haptic_motors=[0.3, 0.2, 0.3],
-            body_yaw_deg=45,                  # Поворот указывает на угрозу
-            body_pitch_deg=0
-        ),
-        AlertMode.HIGH: AlertPattern(
-            light_color=(255, 100, 0),        # Красный-оранжевый
-            light_strobe_hz=5.0,
-            audio_freq_hz=35000,
-            audio_pulse_rate_hz=8.0,          # 8 Hz пульс
-            audio_volume_percent=85,
-            haptic_motors=[0.6, 0.4, 0.6],
-            body_yaw_deg=90,                  # Ясное указание направления
-            body_pitch_deg=10
-        ),
-        AlertMode.CRITICAL: AlertPattern(
-            light_color=(255, 0, 0),          # Ярко красный
-            light_strobe_hz=10.0,
-            audio_freq_hz=40000,
-            audio_pulse_rate_hz=10.0,         # 10 Hz быстрый пульс
-            audio_volume_percent=100,
-            haptic_motors=[1.0, 1.0, 1.0],   # Максимум
-            body_yaw_deg=180,                 # Агрессивный поворот
-            body_pitch_deg=20
-        )
-    }
+    __slots__ = (
+        'led_pins', 'speaker_pin', 'motor_pins', 'robot',
+        'current_mode', 'last_alert_time', 'alert_duration', '_verbose',
+        '_command',
+    )
     
     def __init__(self, led_pins=None, speaker_pin=None, motor_pins=None, 
                  robot_controller=None):
@@ -116,6 +257,14 @@ class DiverAlertController:
         self.last_alert_time = 0
         self.alert_duration = 10  # секунд
         
+        # Вывод предупреждений в лог: без INFO строки не форматируются
+        self._verbose = logger.isEnabledFor(logging.INFO)
+        
+        # Буфер команды предупреждения; первый вызов ядра компилирует его
+        # (или загружает из кэша) заранее, а не на первом предупреждении
+        self._command = np.zeros(1, dtype=_COMMAND_DTYPE).view(np.recarray)
+        _dispatch_kernel(0, 0, 0.0, _PATTERN_TABLE, self._command)
+        
         logger.info("DiverAlertController инициализирован")
     
     def alert_diver(self, threat_assessment, current_time: float):
@@ -128,207 +277,110 @@ class DiverAlertController:
         """
         risk_level = threat_assessment.risk_level
         azimuth = threat_assessment.azimuth_deg
-        closing_speed = threat_assessment.closing_speed_mps
         
-        # Определить режим предупреждения
-        if risk_level <= 1:
-            alert_mode = AlertMode.SAFE
-        elif risk_level <= 3:
-            alert_mode = AlertMode.LOW
-        elif risk_level <= 5:
-            alert_mode = AlertMode.MEDIUM
-        elif risk_level <= 7:
-            alert_mode = AlertMode.HIGH
-        else:
-            alert_mode = AlertMode.CRITICAL
+        # Определить режим предупреждения (уровень риска насыщается в 0-10)
+        mode_idx = int(_RISK_TO_MODE[min(max(int(risk_level), 0), 10)])
+        alert_mode = _ALERT_MODES[mode_idx]
         
         self.current_mode = alert_mode
         self.last_alert_time = current_time
         
-        # Получить паттерн для этого режима
-        pattern = self.ALERT_PATTERNS[alert_mode]
-        
-        # Модулировать паттерн в зависимости от направления угрозы
-        modulated_pattern = self._modulate_pattern_by_azimuth(pattern, azimuth)
-        
-        # 1. СВЕТОВОЕ ПРЕДУПРЕЖДЕНИЕ
-        self._light_warning(modulated_pattern, azimuth)
+        # Бин азимута 0-359: math.floor на скаляре (без диспетчеризации ufunc)
+        # и корректно для отрицательных дробных азимутов, в отличие от int()
+        az_idx = math.floor(azimuth) % 360
         
-        # 2. ЗВУКОВОЕ ПРЕДУПРЕЖДЕНИЕ
-        self._audio_warning(modulated_pattern, azimuth, closing_speed)
+        # Вычислить команду для режима, модулированную направлением угрозы
+        _dispatch_kernel(mode_idx, az_idx, float(azimuth), _PATTERN_TABLE, self._command)
+        command = self._command[0]
         
-        # 3. ВИБРАЦИОННОЕ ПРЕДУПРЕЖДЕНИЕ
-        self._haptic_warning(modulated_pattern, azimuth)
+        # Свет, звук, вибрация и корпус - одним вызовом
+        self._emit(command, threat_assessment)
         
-        # 4. ПОЗИЦИОНИРОВАНИЕ КОРПУСА
-        self._body_warning(modulated_pattern, azimuth, threat_assessment)
-        
-        logger.info(f"Предупреждение уровня {alert_mode.name}: риск={risk_level}, азимут={azimuth:.0f}°")
+        logger.info("Предупреждение уровня %s: риск=%d, азимут=%.0f°",
+                    alert_mode.name, risk_level, azimuth)
     
-    def _modulate_pattern_by_azimuth(self, pattern: AlertPattern, 
-                                     azimuth: float) -> AlertPattern:
+    def _emit(self, command: np.record, threat_assessment):
         """
-        Модулировать паттерн в зависимости от направления угрозы
-        
-        Args:
-            pattern: Базовый паттерн
-            azimuth: Азимут угрозы 0-360°
+        Выдать все четыре модальности предупреждения по одной команде
         
-        Returns:
-            AlertPattern: Модулированный паттерн
-        """
-        # Скопировать паттерн
-        mod_pattern = AlertPattern(
-            light_color=pattern.light_color,
-            light_strobe_hz=pattern.light_strobe_hz,
-            audio_freq_hz=pattern.audio_freq_hz,
-            audio_pulse_rate_hz=pattern.audio_pulse_rate_hz,
-            audio_volume_percent=pattern.audio_volume_percent,
-            haptic_motors=pattern.haptic_motors.copy(),
-            body_yaw_deg=azimuth,  # ← Рыскание указывает на азимут угрозы!
-            body_pitch_deg=pattern.body_pitch_deg
-        )
+        Все азимутные величины (LED, свип, ШИМ моторов, рыскание) уже
+        посчитаны ядром _dispatch_kernel за один проход; здесь они только
+        раздаются на выходы.
         
-        return mod_pattern
-    
-    def _light_warning(self, pattern: AlertPattern, azimuth: float):
-        """
-        LED стробоскоп кодирует информацию об угрозе
-        
-        Кодирование:
+        1. СВЕТ - LED стробоскоп:
         - Цвет: Красный (опасность) -> Янтарный (осторожность) -> Зелёный (безопасно)
         - Частота стробо: 0.1 Hz (низкий риск) -> 10 Hz (критично)
-        - Позиция LED: Свет направлен на азимут угрозы
+        - Позиция LED: 8 LED по окружности, свет направлен на азимут угрозы
+          (0° = передний, 90° = правый (старборд), 180° = задний, 270° = левый (порт))
         
-        Пример: Риск 8, азимут 45° (северо-восток):
-        → Красный цвет, 5 Hz стробо
-        → Самые яркие передне-правые LED
-        """
-        color = pattern.light_color
-        strobe_hz = pattern.light_strobe_hz
+        2. ЗВУК - ультразвуковой тон:
+        - Базовая частота: 15 кГц (низкий риск) -> 40 кГц (критично)
+        - Модуляция: постоянный тон (дальняя угроза) -> пульс 5 Hz
+          (приближается) -> быстрый пульс 10 Hz (критично)
+        - Доплеровский свип -100..+100% кодирует направление
+          (0° = без свипа, 45° = восходящий, 180° = нисходящий)
         
-        # Определить позицию LED (8 LED по окружности)
-        # 0° = передний, 90° = правый (старборд), 180° = задний, 270° = левый (порт)
-        led_idx = int((azimuth / 45) % 8)
+        3. ВИБРАЦИЯ - три мотора [левый борт, центр, правый борт]:
+        - Азимут 0° (спереди): Вибрирует центр
+        - Азимут 90° (справа): Вибрирует справа
+        - Азимут 270° (слева): Вибрирует слева
+        - Интенсивность: уровень_риска -> скважность ШИМ (0-255)
         
-        print(f"💡 СВЕТ: Цвет={color}, Стробо={strobe_hz}Hz, LED_направление={led_idx*45}°")
+        4. КОРПУС - робот СТАНОВИТСЯ СТРЕЛКОЙ, указывающей на опасность:
+        - Рыскание: Выравнивание курса робота с азимутом угрозы
+        - Наклон: Указание вверх для угроз с поверхности
+        - Удержание: 5-10 секунд чтобы дайвер увидел ориентацию
+        
+        Args:
+            command: Запись _COMMAND_DTYPE, заполненная _dispatch_kernel
+            threat_assessment: ThreatAssessment из threat_assessment.py
+        """
+        if self._verbose:
+            motor_powers = command.motor_duty
+            logger.info("💡 СВЕТ: Цвет=%s, Стробо=%sHz, LED_направление=%d°",
+                        tuple(command.light_color.tolist()), command.light_strobe_hz,
+                        int(command.led_idx) * 45)
+            logger.info("🔊 ЗВУК: Частота=%dHz, Пульс=%sHz, Громкость=%d%%, Доплер=%+d%%",
+                        command.audio_freq_hz, command.audio_pulse_rate_hz,
+                        command.audio_volume_percent, command.audio_sweep_percent)
+            logger.info("📳 ВИБРАЦИЯ: Левый=%d, Центр=%d, Правый=%d",
+                        motor_powers[0], motor_powers[1], motor_powers[2])
+            logger.info("🤖 КОРПУС: Рыскание=%.0f°, Наклон=%.0f°\n"
+                        "   Это визуальная стрелка, указывающая на: %s",
+                        command.body_yaw_deg, command.body_pitch_deg,
+                        threat_assessment.vessel_type.upper())
         
         # Реальная реализация:
         # self.led_strip.strobe_pattern(
-        #     color=color,
-        #     frequency_hz=strobe_hz,
-        #     focus_led_idx=led_idx,
+        #     color=tuple(command.light_color.tolist()),
+        #     frequency_hz=command.light_strobe_hz,
+        #     focus_led_idx=int(command.led_idx),
         #     brightness=255,
         #     duration_s=self.alert_duration
         # )
-    
-    def _audio_warning(self, pattern: AlertPattern, azimuth: float, 
-                      closing_speed: float):
-        """
-        Ультразвуковой тон кодирует информацию об угрозе
-        
-        Кодирование:
-        - Базовая частота: 15 кГц (низкий риск) -> 40 кГц (критично)
-        - Модуляция:
-          - Постоянный тон: Дальняя угроза
-          - Пульсирующий (5 Hz): Приближается
-          - Быстрый пульс (10 Hz): Критично
-        - Частотный свип: Указывает направление (эффект Доплера)
-        """
-        base_freq = pattern.audio_freq_hz
-        pulse_rate = pattern.audio_pulse_rate_hz
-        volume = pattern.audio_volume_percent
-        
-        # Доплеровский свип для кодирования направления
-        # Азимут 0° = без свипа (спереди)
-        # Азимут 45° = восходящий свип (приближается спереди-справа)
-        # Азимут 180° = нисходящий свип (приближается сзади)
-        sweep_direction = int((azimuth - 180) / 180 * 100)  # -100 to +100%
-        
-        print(f"🔊 ЗВУК: Частота={base_freq}Hz, Пульс={pulse_rate}Hz, Громкость={volume}%, Доплер={sweep_direction:+d}%")
-        
-        # Реальная реализация:
         # self.speaker.play_tone(
-        #     frequency=base_freq,
-        #     pulse_rate=pulse_rate,
+        #     frequency=int(command.audio_freq_hz),
+        #     pulse_rate=command.audio_pulse_rate_hz,
         #     duration_s=self.alert_duration,
-        #     doppler_sweep=sweep_direction,
-        #     volume=volume/100
+        #     doppler_sweep=int(command.audio_sweep_percent),
+        #     volume=command.audio_volume_percent/100
         # )
-    
-    def _haptic_warning(self, pattern: AlertPattern, azimuth: float):
-        """
-        Вибрирующие моторы кодируют направление угрозы
-        
-        Расположение моторов:
-        - Мотор 0: Левый борт (порт)
-        - Мотор 1: Центральный
-        - Мотор 2: Правый борт (старборд)
-        
-        Кодирование:
-        - Азимут 0° (спереди): Вибрирует центр
-        - Азимут 90° (справа): Вибрирует справа
-        - Азимут 270° (слева): Вибрирует слева
-        - Интенсивность: уровень_риска -> амплитуда вибрации (0-1)
-        """
-        # Преобразовать азимут в активацию моторов
-        # Использовать тригонометрию для плавного распределения
-        rad = np.radians(azimuth)
-        
-        motor_powers = [
-            max(0, -np.sin(rad)) * pattern.haptic_motors[0],  # Левый
-            np.cos(rad) * pattern.haptic_motors[1],           # Центральный (макс спереди)
-            max(0, np.sin(rad)) * pattern.haptic_motors[2]    # Правый
-        ]
-        
-        # Нормализовать
-        max_power = max(motor_powers) if max(motor_powers) > 0 else 1
-        motor_powers = [p / max_power for p in motor_powers]
-        
-        print(f"📳 ВИБРАЦИЯ: Левый={motor_powers[0]:.2f}, Центр={motor_powers[1]:.2f}, Правый={motor_powers[2]:.2f}")
-        
-        # Реальная реализация:
-        # for motor_idx, power in enumerate(motor_powers):
+        # for motor_idx, power in enumerate(command.motor_duty):
         #     self.vibration_motors[motor_idx].set_pwm(power)
         #     time.sleep(0.05)
-    
-    def _body_warning(self, pattern: AlertPattern, azimuth: float, 
-                     threat_assessment):
-        """
-        Робот физически ориентирует свой корпус к угрозе
-        
-        Это САМОЕ ИНТУИТИВНОЕ предупреждение для дайвера:
-        Корпус робота СТАНОВИТСЯ СТРЕЛКОЙ, указывающей на опасность!
-        
-        Команды:
-        - Рыскание: Выравнивание курса робота с азимутом угрозы
-        - Наклон: Указание вверх для угроз с поверхности
-        - Удержание: 5-10 секунд чтобы дайвер увидел ориентацию
-        
-        Пример: Угроза на азимуте 135° (юго-восток)
-        → Робот рыскает 135° от своего текущего курса
-        → Дайвер видит робот, указывающий на угрозу
-        """
-        desired_yaw = pattern.body_yaw_deg
-        desired_pitch = pattern.body_pitch_deg
-        
-        print(f"🤖 КОРПУС: Рыскание={desired_yaw:.0f}°, Наклон={desired_pitch:.0f}°")
-        print(f"   Это визуальная стрелка, указывающая на: {threat_assessment.vessel_type.upper()}")
-        
-        # Реальная реализация (для Blue Robotics ArduSub):
+        #
+        # Для Blue Robotics ArduSub:
         # if self.robot:
         #     # Установить желаемый курс (рыскание)
-        #     self.robot.set_desired_heading(desired_yaw, speed=0.5)
+        #     self.robot.set_desired_heading(command.body_yaw_deg, speed=0.5)
         #     
         #     # Ждать ротации (обычно 3-5 секунд для 180°)
         #     time.sleep(3)
         #     
         #     # Наклон камеры/антенны если нужно
-        #     if abs(desired_pitch) > 5:
-        #         self.robot.tilt_camera(angle=desired_pitch, speed=0.3)
+        #     if abs(command.body_pitch_deg) > 5:
+        #         self.robot.tilt_camera(angle=command.body_pitch_deg, speed=0.3)
         #         time.sleep(2)
-        #     
-        #     logger.info(f"Робот ориентирован на {desired_yaw}° указывая на угрозу")
     
     def clear_alert(self):
         """Очистить текущее предупреждение"""
@@ -356,7 +408,7 @@ class MockLEDStrip:
 if __name__ == "__main__":
     print("=== Тест DiverAlertController ===\n")
     
-    from threat_assessment import ThreatAssessment
+    from threat_assessment import ThreatAssessment, TTC_SENTINEL, classify_reco
     
     controller = DiverAlertController()
     
@@ -368,7 +420,7 @@ if __name__ == "__main__":
             'azimuth_deg': 45,
             'elevation_deg': 0,
             'closing_speed_mps': -1,
-            'ttc_s': float('inf'),
+            'ttc_s': TTC_SENTINEL,
             'risk_level': 1,
             'vessel_type': 'ship',
             'threat_prob': 0.01
@@ -411,7 +463,8 @@ if __name__ == "__main__":
             risk_level=scenario['risk_level'],
             vessel_type=scenario['vessel_type'],
             threat_probability=scenario['threat_prob'],
-            recommendation="Тестовое предупреждение"
+            reco=classify_reco(scenario['risk_level'], scenario['vessel_type'],
+                               scenario['azimuth_deg'], scenario['ttc_s'])
         )
         
         # Выдать предупреждение
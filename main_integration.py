@@ -5,12 +5,14 @@ import numpy as np
 import time
 import logging
 from typing import Optional
+from numba import njit, prange
 
 # Импортировать все модули
 from sensor_fusion import SensorFusionEngine, FusedState
 from propeller_classifier import PropellerSignatureClassifier, VesselClassification
 from threat_assessment import ThreatAssessmentEngine, ThreatAssessment
 from diver_alert_controller import DiverAlertController
+from spectrum import compute_spectrum
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,6 +20,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger("DiveGuardMain")
 
+# Уровень логирования фиксируется при старте: отладочные сообщения кадра
+# не форматируются, если DEBUG выключен
+_DEBUG = logger.isEnabledFor(logging.DEBUG)
+
+
+# Без явной сигнатуры: ядро нужно только симуляции и компилируется (или
+# загружается из кэша) при первом вызове, а не при импорте модуля
+@njit(cache=True, fastmath=True, parallel=True)
+def _synthesize_boat_frames(out, bpf, harmonics, intensity, noise):
+    """
+    Синтезировать все кадры акустики лодки одним вызовом сразу в PCM int16
+    
+    Время в каждом кадре отсчитывается от нуля, поэтому гармоники
+    одинаковы для всех кадров и считаются один раз заранее; здесь
+    остаются смешивание по интенсивности, шум и перевод в int16 с
+    насыщением - за один проход, без промежуточного float-буфера.
+    
+    Args:
+        out: Выходная матрица PCM int16 (num_frames, n)
+        bpf: sin(2π·100·t) - BPF лодки
+        harmonics: bpf + 0.5·sin(2π·200·t) + 0.3·sin(2π·300·t) + 0.2·sin(2π·15000·t)
+        intensity: Интенсивность сигнала 0-1 для каждого кадра
+        noise: Нормальный шум N(0, 1) той же формы, что и out
+    """
+    num_frames, n = out.shape
+    for f in prange(num_frames):
+        amp = np.float32(intensity[f])
+        for i in range(n):
+            # bpf·(1 + I) + I·(гармоники + кавитация) - BPF и кавитация растут
+            # + шум 0.05·N(0, 1)
+            s = bpf[i] + amp * harmonics[i] + np.float32(0.05) * noise[f, i]
+            
+            # Масштаб и насыщение в диапазон int16
+            v = s * np.float32(32767.0)
+            if v > np.float32(32767.0):
+                v = np.float32(32767.0)
+            elif v < np.float32(-32768.0):
+                v = np.float32(-32768.0)
+            out[f, i] = np.int16(v)
+
+
 class DiveGuardPropellerDetector:
     """
     Главный модуль обнаружения винтов гребных винтов DiveGuard
@@ -66,7 +109,12 @@ class DiveGuardPropellerDetector:
         # Статистика
         self.threats_detected = 0
         self.critical_events = 0
-        self.processing_times = []
+        
+        # Кольцевой буфер последних 100 времён обработки + бегущая сумма
+        self._pt_buf = np.empty(100, dtype=np.float32)
+        self._pt_head = 0
+        self._pt_fill = 0
+        self._pt_sum = 0.0
         
         logger.info("✓ DiveGuard готов к работе!\n")
     
@@ -88,23 +136,29 @@ class DiveGuardPropellerDetector:
         start_time = time.time()
         
         try:
+            # Спектр гидрофона - один раз для слияния и классификации
+            spectrum = compute_spectrum(acoustic_data)
+            
             # ШАГ 1: Слияние датчиков SONAR + HYDROPHONE
-            fused_state = self.sensor_fusion.fuse_sonar_hydrophone(
-                sonar_data, acoustic_data
+            fused_state = self.sensor_fusion.fuse_from_spectrum(
+                sonar_data, spectrum
             )
-            logger.debug(f"Фузия датчиков: расстояние={fused_state.distance:.1f}м, азимут={fused_state.azimuth:.1f}°")
+            if _DEBUG:
+                logger.debug(f"Фузия датчиков: расстояние={fused_state.distance:.1f}м, азимут={fused_state.azimuth:.1f}°")
             
             # ШАГ 2: Классификация типа судна
-            vessel_classification = self.classifier.classify_from_hydrophone(
-                acoustic_data
+            vessel_classification = self.classifier.classify_from_spectrum(
+                spectrum
             )
-            logger.debug(f"Классификация: тип={vessel_classification.vessel_type}, уверенность={vessel_classification.confidence:.0%}")
+            if _DEBUG:
+                logger.debug(f"Классификация: тип={vessel_classification.vessel_type}, уверенность={vessel_classification.confidence:.0%}")
             
             # ШАГ 3: Оценка угрозы
             threat_assessment = self.threat_engine.assess_threat(
                 fused_state, vessel_classification
             )
-            logger.info(f"Угроза: {threat_assessment.vessel_type} на {threat_assessment.distance_m:.0f}м, риск {threat_assessment.risk_level}/10")
+            logger.info("Угроза: %s на %.0fм, риск %d/10", threat_assessment.vessel_type,
+                        threat_assessment.distance_m, threat_assessment.risk_level)
             
             # ШАГ 4: Выдать предупреждение
             if threat_assessment.risk_level >= 1:
@@ -112,18 +166,19 @@ class DiveGuardPropellerDetector:
                 if threat_assessment.risk_level >= 8:
                     self.critical_events += 1
                 
+                # Время начала кадра: отличается от текущего на доли мс,
+                # для длительности предупреждения этого достаточно
                 self.alert_controller.alert_diver(
                     threat_assessment, 
-                    current_time=time.time()
+                    current_time=start_time
                 )
             
             # Записать время обработки
             processing_time = time.time() - start_time
-            self.processing_times.append(processing_time)
-            if len(self.processing_times) > 100:
-                self.processing_times.pop(0)
+            self._record_processing_time(processing_time)
             
-            logger.debug(f"Время обработки: {processing_time*1000:.1f} мс")
+            if _DEBUG:
+                logger.debug(f"Время обработки: {processing_time*1000:.1f} мс")
             
             return threat_assessment
         
@@ -131,15 +186,26 @@ class DiveGuardPropellerDetector:
             logger.error(f"Ошибка обработки данных датчиков: {e}", exc_info=True)
             return None
     
+    def _record_processing_time(self, processing_time: float):
+        """Добавить время обработки кадра в кольцевой буфер"""
+        size = self._pt_buf.size
+        old = self._pt_buf[self._pt_head] if self._pt_fill == size else 0.0
+        self._pt_buf[self._pt_head] = processing_time
+        self._pt_sum += float(self._pt_buf[self._pt_head] - old)
+        self._pt_head = (self._pt_head + 1) % size
+        self._pt_fill = min(size, self._pt_fill + 1)
+    
     def get_statistics(self) -> dict:
         """Получить статистику системы"""
-        avg_processing_time = np.mean(self.processing_times) if self.processing_times else 0
+        fill = self._pt_fill
+        avg_processing_time = self._pt_sum / fill if fill else 0
+        max_processing_time = float(self._pt_buf[:fill].max()) if fill else 0
         
         return {
             'threats_detected': self.threats_detected,
             'critical_events': self.critical_events,
             'avg_processing_time_ms': avg_processing_time * 1000,
-            'max_processing_time_ms': max(self.processing_times) * 1000 if self.processing_times else 0,
+            'max_processing_time_ms': max_processing_time * 1000,
             'sensor_fusion_history_len': len(self.sensor_fusion.state_history),
             'alert_mode': self.alert_controller.current_mode.name
         }
@@ -179,10 +245,40 @@ def run_simulation():
     # Сценарий: Быстрая лодка приближается с азимута 45°
     print("Сценарий: Быстрая лодка приближается с расстояния 500м до 50м\n")
     
+    # Линейное уменьшение расстояния (приближение): 500м -> 50м
+    distances = 500 - np.arange(num_frames) * (450 / num_frames)
+    azimuth = 45  # Фиксированное направление
+    
+    # Увеличивать интенсивность при приближении
+    intensities = 1 - distances / 500
+    
+    # Синтезировать акустику лодки для всех кадров сразу
+    # (BPF быстрой лодки около 100 Hz)
+    n = int(round(duration_per_frame * sample_rate))
+    
+    # Гармоники не зависят от кадра: считаются один раз в общих буферах
+    # (фаза в float64, сами сигналы в float32)
+    t = np.arange(n, dtype=np.float64) / sample_rate
+    partial = np.empty_like(t)
+    bpf = np.empty(n, dtype=np.float32)
+    np.sin(np.multiply(t, 2*np.pi*100, out=partial), out=bpf)
+    harmonics = bpf.copy()
+    for freq, gain in ((200, 0.5), (300, 0.3), (15000, 0.2)):
+        np.multiply(t, 2*np.pi*freq, out=partial)
+        np.sin(partial, out=partial)
+        partial *= gain
+        harmonics += partial
+    
+    # Шум: генератор PCG64 пишет сразу в предвыделенный буфер
+    rng = np.random.default_rng(42)
+    noise = np.empty((num_frames, n), dtype=np.float32)
+    rng.standard_normal(dtype=np.float32, out=noise)
+    
+    acoustic_buffers = np.empty((num_frames, n), dtype=np.int16)
+    _synthesize_boat_frames(acoustic_buffers, bpf, harmonics, intensities, noise)
+    
     for frame in range(num_frames):
-        # Линейное уменьшение расстояния (приближение)
-        distance = 500 - frame * (450 / num_frames)  # 500м -> 50м
-        azimuth = 45  # Фиксированное направление
+        distance = distances[frame]
         
         # SONAR данные
         sonar_data = {
@@ -190,24 +286,7 @@ def run_simulation():
             'azimuth': azimuth,
             'elevation': 0
         }
-        
-        # Синтезировать акустику лодки
-        # BPF быстрой лодки около 100 Hz
-        t = np.arange(0, duration_per_frame, 1/sample_rate)
-        
-        # Увеличивать интенсивность при приближении
-        intensity = (1 - distance / 500)
-        
-        boat_signal = (
-            np.sin(2*np.pi*100*t) * (1 + intensity) +      # BPF растёт
-            0.5*np.sin(2*np.pi*200*t) * intensity +
-            0.3*np.sin(2*np.pi*300*t) * intensity +
-            0.2*np.sin(2*np.pi*15000*t) * intensity  # Кавитация растёт
-        )
-        
-        # Добавить шум
-        boat_signal += 0.05 * np.random.randn(len(boat_signal))
-        acoustic_buffer = (boat_signal * 32767).astype(np.int16)
+        acoustic_buffer = acoustic_buffers[frame]
         
         # Обработать данные
         print(f"Кадр {frame+1}/{num_frames}: Расстояние {distance:.0f}м, Азимут {azimuth:.1f}°")
@@ -2,18 +2,136 @@
 # Классификатор сигнатур гребных винтов для определения типа судна
 
 import numpy as np
-from scipy import signal
 from dataclasses import dataclass
 import logging
-from typing import Dict, Tuple
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+from numba import njit, prange
+
+from spectrum import SpectrumFrame, compute_spectra, compute_spectrum, find_spectral_peaks
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("PropellerClassifier")
 
+# История классификаций для сглаживания: длина и строки SoA-буфера
+_HISTORY_LEN = 5
+_H_CONF, _H_RPM, _H_CAV, _H_THREAT, _H_BLADES = range(5)
+
+
+@njit(cache=True)
+def _features_core(freqs, p, e100, e1k, e5k, e30k):
+    """
+    Числовые признаки спектра за один проход
+    
+    Центроид, энергии полос, кавитационный уровень и эксцесс считаются в
+    одном цикле; центральные моменты M2-M4 обновляются устойчиво
+    (обобщение алгоритма Уэлфорда), эксцесс - как scipy.stats.kurtosis
+    (Фишер, смещённый).
+    
+    Args:
+        freqs: Массив частот
+        p: Спектр мощности
+        e100, e1k, e5k, e30k: Границы полос в бинах (см. _get_band_edges)
+    
+    Returns:
+        tuple: (центроид, эксцесс, энергия <100 Гц, 100 Гц-1 кГц, >1 кГц,
+                средний уровень 5-30 кГц)
+    """
+    sum_p = 0.0
+    sum_fp = 0.0
+    e_low = 0.0
+    e_mid = 0.0
+    e_high = 0.0
+    e_cav = 0.0
+    mean = 0.0
+    m2 = 0.0
+    m3 = 0.0
+    m4 = 0.0
+    n = 0
+    for i in range(p.size):
+        v = np.float64(p[i])
+        sum_p += v
+        sum_fp += freqs[i] * v
+        
+        if i < e100:
+            e_low += v
+        elif i < e1k:
+            e_mid += v
+        else:
+            e_high += v
+        if e5k <= i < e30k:
+            e_cav += v
+        
+        n1 = n
+        n += 1
+        delta = v - mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        mean += delta_n
+        m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * m2 - 4 * delta_n * m3
+        m3 += term1 * delta_n * (n - 2) - 3 * delta_n * m2
+        m2 += term1
+    
+    centroid = sum_fp / sum_p if sum_p > 0 else 0.0
+    kurtosis = n * m4 / (m2 * m2) - 3 if m2 > 0 else np.nan
+    cavitation = e_cav / (e30k - e5k) if e30k > e5k else 0.0
+    return centroid, kurtosis, e_low, e_mid, e_high, cavitation
+
+
+# Столбцы матрицы признаков пакетной классификации (_features_batch)
+_BATCH_FEATURES = (
+    'spectral_centroid', 'kurtosis', 'energy_low', 'energy_mid', 'energy_high',
+    'cavitation_level', 'num_peaks', 'num_harmonics', 'bpf_freq', 'bpf_power',
+)
+
+
+@njit(cache=True, parallel=True)
+def _features_batch(freqs, power, e100, e1k, e5k, e30k, out):
+    """
+    Признаки для пакета спектров, строки обрабатываются параллельно
+    
+    Те же признаки, что и _extract_acoustic_features, но без массивов
+    пиков: от пиков остаются их число, число гармоник и BPF.
+    
+    Args:
+        freqs: Массив частот
+        power: Спектры мощности (B, n_bins)
+        e100, e1k, e5k, e30k: Границы полос в бинах (см. _get_band_edges)
+        out: Матрица признаков (B, len(_BATCH_FEATURES))
+    """
+    for b in prange(power.shape[0]):
+        p = power[b]
+        centroid, kurtosis, e_low, e_mid, e_high, cavitation = _features_core(
+            freqs, p, e100, e1k, e5k, e30k)
+        
+        # Пики: BPF - самый мощный ниже 500 Гц, гармоники - пики 0-500 Гц
+        peaks = find_spectral_peaks(p, 0.05, 5, 0.03)
+        bpf = -1
+        harmonics = 0
+        for pk in peaks:
+            if freqs[pk] < 500:
+                if bpf < 0 or p[pk] > p[bpf]:
+                    bpf = pk
+                if freqs[pk] > 0:
+                    harmonics += 1
+        
+        out[b, 0] = centroid
+        out[b, 1] = kurtosis
+        out[b, 2] = e_low
+        out[b, 3] = e_mid
+        out[b, 4] = e_high
+        out[b, 5] = cavitation
+        out[b, 6] = peaks.size
+        out[b, 7] = harmonics
+        out[b, 8] = freqs[bpf] if bpf >= 0 else 0.0
+        out[b, 9] = p[bpf] if bpf >= 0 else 0.0
+
+
 @dataclass
 class VesselClassification:
     """Классификация судна по акустической сигнатуре"""
-    vessel_type: str           # 'ship', 'submarine', 'rov', 'boat', 'auv'
+    vessel_type: str           # 'ship', 'submarine', 'rov', 'boat', 'auv', 'unknown' (интернированные литералы)
     confidence: float          # 0-1
     propeller_rpm_estimate: float
     blade_count_estimate: int
@@ -67,10 +185,39 @@ class PropellerSignatureClassifier:
         }
     }
     
+    # Таблица скоринга для _classify_by_features: строки в порядке
+    # VESSEL_SIGNATURES, по критерию - диапазон [lo, hi] и вес. Строгие
+    # границы правил (центроид ROV > 2000 Гц, кавитация подлодки > 0.3,
+    # корабля < 0.1) заданы через np.nextafter
+    _VESSEL_NAMES = tuple(VESSEL_SIGNATURES)
+    _BPF_LO = np.array([sig['bpf_range'][0] for sig in VESSEL_SIGNATURES.values()], dtype=float)
+    _BPF_HI = np.array([sig['bpf_range'][1] for sig in VESSEL_SIGNATURES.values()], dtype=float)
+    # (ship, submarine, boat, rov, auv)
+    _CENT_LO = np.array([50.0, 100.0, 100.0, np.nextafter(2000, np.inf), 300.0])
+    _CENT_HI = np.array([200.0, 300.0, 500.0, np.inf, 1000.0])
+    _CAV_LO = np.array([-np.inf, np.nextafter(0.3, np.inf), 0.1, 0.0, 0.0])
+    _CAV_HI = np.array([np.nextafter(0.1, -np.inf), np.inf, 0.4, 0.0, 0.0])
+    _CAV_W = np.array([0.1, 0.3, 0.2, 0.0, 0.0])
+    _HARM_LO = np.array([3, 0, 0, 0, 0])
+    _HARM_HI = np.array([np.iinfo(np.int64).max, 0, 0, 2, 0])
+    _HARM_W = np.array([0.2, 0.0, 0.0, 0.2, 0.0])
+    
     def __init__(self):
         """Инициализация классификатора"""
         self.threshold = 0.6  # Порог уверенности для классификации
-        self.history = []  # История классификаций для сглаживания
+        
+        # История классификаций для сглаживания (кольцевой буфер SoA:
+        # строка на параметр, столбец на кадр) и типы судов по кадрам
+        # (deque с maxlen вытесняет старейший тип за O(1))
+        self._hist_values = np.zeros((5, _HISTORY_LEN))
+        self._hist_types = deque(maxlen=_HISTORY_LEN)
+        self._hist_head = 0
+        self._hist_fill = 0
+        
+        self._windowed = np.empty(0, dtype=np.float32)  # Буфер окна под длину кадра
+        self._power = np.empty(0, dtype=np.float32)     # Буфер спектра под длину кадра
+        self._band_key = None  # Сетка частот, для которой посчитаны границы полос
+        self._band_edges = (0, 0, 0, 0)
     
     def classify_from_hydrophone(self, audio_buffer: np.ndarray, 
                                 sample_rate: int = 48000) -> VesselClassification:
@@ -84,7 +231,26 @@ class PropellerSignatureClassifier:
         Returns:
             VesselClassification: Классификация судна с параметрами
         """
-        if audio_buffer is None or len(audio_buffer) < 512:
+        # Буферы окна и спектра переиспользуются, пока не меняется длина
+        # кадра (спектр кадра не хранится после классификации)
+        if audio_buffer is not None and self._windowed.size != len(audio_buffer):
+            self._windowed = np.empty(len(audio_buffer), dtype=np.float32)
+            self._power = np.empty(len(audio_buffer) // 2 + 1, dtype=np.float32)
+        
+        spectrum = compute_spectrum(audio_buffer, sample_rate, self._windowed, self._power)
+        return self.classify_from_spectrum(spectrum)
+    
+    def classify_from_spectrum(self, spectrum: Optional[SpectrumFrame]) -> VesselClassification:
+        """
+        Классифицировать тип судна по уже вычисленному спектру кадра
+        
+        Args:
+            spectrum: SpectrumFrame из spectrum.compute_spectrum (None - нет данных)
+        
+        Returns:
+            VesselClassification: Классификация судна с параметрами
+        """
+        if spectrum is None:
             return VesselClassification(
                 vessel_type='unknown',
                 confidence=0,
@@ -94,17 +260,8 @@ class PropellerSignatureClassifier:
                 threat_level=0
             )
         
-        # Нормализация в float32 (-1.0 до 1.0)
-        if audio_buffer.dtype == np.int16:
-            audio_normalized = audio_buffer.astype(np.float32) / 32768
-        else:
-            audio_normalized = audio_buffer.astype(np.float32)
-        
-        # FFT с окном Ханна
-        windowed = audio_normalized * signal.windows.hann(len(audio_normalized))
-        freqs = np.fft.rfftfreq(len(windowed), 1/sample_rate)
-        fft_vals = np.abs(np.fft.rfft(windowed))
-        fft_vals = fft_vals / np.max(fft_vals) if np.max(fft_vals) > 0 else fft_vals
+        freqs = spectrum.freqs
+        fft_vals = spectrum.power
         
         # Извлечь признаки для классификации
         features = self._extract_acoustic_features(freqs, fft_vals)
@@ -113,12 +270,41 @@ class PropellerSignatureClassifier:
         classification = self._classify_by_features(features, freqs, fft_vals)
         
         # Сохранить в историю для сглаживания
-        self.history.append(classification)
-        if len(self.history) > 5:
-            self.history.pop(0)
+        self._record_classification(classification)
         
         # Вернуть сглаженную классификацию
-        return self._smooth_classification(self.history)
+        return self._smooth_classification()
+    
+    def classify_batch(self, buffers: np.ndarray,
+                       sample_rate: int = 48000) -> List[VesselClassification]:
+        """
+        Классифицировать пакет буферов одной длины (каналы гидрофонной решётки)
+        
+        FFT всего пакета считается одним вызовом на всех ядрах, признаки -
+        параллельно по буферам. Буферы относятся к одному моменту времени,
+        поэтому история сглаживания не используется и не пополняется.
+        
+        Args:
+            buffers: Матрица аудиосэмплов (B, N), PCM int16
+            sample_rate: сэмпли в секунду (Гц)
+        
+        Returns:
+            list: VesselClassification для каждого буфера (без сглаживания)
+        """
+        if buffers.shape[1] < 512:
+            return [self.classify_from_spectrum(None) for _ in range(buffers.shape[0])]
+        
+        freqs, power = compute_spectra(buffers, sample_rate)
+        table = np.empty((power.shape[0], len(_BATCH_FEATURES)))
+        _features_batch(freqs, power, *self._get_band_edges(freqs), table)
+        
+        classifications = []
+        for row in table.tolist():
+            features = dict(zip(_BATCH_FEATURES, row))
+            features['num_peaks'] = int(features['num_peaks'])
+            features['num_harmonics'] = int(features['num_harmonics'])
+            classifications.append(self._classify_by_features(features, freqs, None))
+        return classifications
     
     def _extract_acoustic_features(self, freqs: np.ndarray, 
                                   power_spectrum: np.ndarray) -> Dict:
@@ -133,14 +319,15 @@ class PropellerSignatureClassifier:
             dict: Словарь признаков
         """
         # 1. Найти пики (BPF + гармоники)
-        peaks, properties = signal.find_peaks(
-            power_spectrum, height=0.05, distance=5, prominence=0.03
-        )
+        peaks = find_spectral_peaks(power_spectrum, 0.05, 5, 0.03)
         
+        peak_freqs = freqs[peaks]
         features = {
             'num_peaks': len(peaks),
-            'peak_freqs': freqs[peaks] if len(peaks) > 0 else [],
+            'peak_freqs': peak_freqs if len(peaks) > 0 else [],
             'peak_powers': power_spectrum[peaks] if len(peaks) > 0 else [],
+            # Количество гармоник (пики 0-500 Гц)
+            'num_harmonics': int(np.count_nonzero((peak_freqs > 0) & (peak_freqs < 500))),
         }
         
         # 2. BPF (первый или основной пик в низкой частоте)
@@ -153,24 +340,39 @@ class PropellerSignatureClassifier:
             features['bpf_freq'] = 0
             features['bpf_power'] = 0
         
-        # 3. Спектральный центроид (корабли низкие, ROV высокие)
-        spectral_centroid = np.sum(freqs * power_spectrum) / np.sum(power_spectrum)
-        features['spectral_centroid'] = spectral_centroid
+        # 3-6. Центроид, эксцесс, энергии полос и кавитация - одним проходом
+        # компилированного ядра; границы полос в бинах считаются один раз на
+        # сетку частот
+        (features['spectral_centroid'],   # корабли низкие, ROV высокие
+         features['kurtosis'],            # кавитация имеет высокий эксцесс
+         features['energy_low'],          # <100Hz
+         features['energy_mid'],          # 100Hz-1kHz
+         features['energy_high'],         # >1kHz
+         features['cavitation_level']     # широкополосный шум 5-30 кГц
+         ) = _features_core(freqs, power_spectrum, *self._get_band_edges(freqs))
         
-        # 4. Кэртозис (острота) - кавитация имеет высокий кэртозис
-        kurtosis = signal.kurtosis(power_spectrum)
-        features['kurtosis'] = kurtosis
+        return features
+    
+    def _get_band_edges(self, freqs: np.ndarray) -> Tuple[int, int, int, int]:
+        """
+        Границы частотных полос в индексах бинов (кэш по сетке частот)
         
-        # 5. Энергия в разных частотных диапазонах
-        features['energy_low'] = np.sum(power_spectrum[freqs < 100])      # <100Hz
-        features['energy_mid'] = np.sum(power_spectrum[(freqs >= 100) & (freqs < 1000)])
-        features['energy_high'] = np.sum(power_spectrum[freqs >= 1000])   # >1kHz
+        Сетка rfft линейна от 0, поэтому однозначно задаётся числом бинов
+        и последней частотой.
         
-        # 6. Кавитационный уровень (широкополосный шум 5-30 кГц)
-        cavitation_region = power_spectrum[(freqs >= 5000) & (freqs <= 30000)]
-        features['cavitation_level'] = np.mean(cavitation_region) if len(cavitation_region) > 0 else 0
+        Args:
+            freqs: Массив частот (возрастающий)
         
-        return features
+        Returns:
+            tuple: (100 Гц, 1 кГц, 5 кГц, 30 кГц включительно)
+        """
+        key = (len(freqs), float(freqs[-1]))
+        if key != self._band_key:
+            e100, e1k, e5k = np.searchsorted(freqs, [100, 1000, 5000])
+            e30k = np.searchsorted(freqs, 30000, side='right')
+            self._band_edges = (int(e100), int(e1k), int(e5k), int(e30k))
+            self._band_key = key
+        return self._band_edges
     
     def _classify_by_features(self, features: Dict, freqs: np.ndarray, 
                             power_spectrum: np.ndarray) -> VesselClassification:
@@ -185,56 +387,24 @@ class PropellerSignatureClassifier:
         Returns:
             VesselClassification: Наиболее вероятная классификация
         """
-        scores = {}
-        
         bpf_freq = features.get('bpf_freq', 0)
+        centroid = features['spectral_centroid']
+        cavitation = features['cavitation_level']
+        num_harmonics = features['num_harmonics']
+        
+        # Скоринг всех типов судна сразу по таблице критериев:
+        # 1. BPF, 2. энергетический профиль, 3. кавитация, 4. гармоники
+        scores = (
+            0.3 * ((bpf_freq >= self._BPF_LO) & (bpf_freq <= self._BPF_HI))
+            + 0.2 * ((centroid >= self._CENT_LO) & (centroid <= self._CENT_HI))
+            + self._CAV_W * ((cavitation >= self._CAV_LO) & (cavitation <= self._CAV_HI))
+            + self._HARM_W * ((num_harmonics >= self._HARM_LO) & (num_harmonics <= self._HARM_HI))
+        )
         
-        # Скоринг каждого типа судна
-        for vessel_type, sig in self.VESSEL_SIGNATURES.items():
-            score = 0
-            
-            # 1. Совпадение BPF диапазона
-            if sig['bpf_range'][0] <= bpf_freq <= sig['bpf_range'][1]:
-                score += 0.3
-            
-            # 2. Совпадение энергетического профиля
-            centroid = features['spectral_centroid']
-            
-            if vessel_type == 'ship' and 50 <= centroid <= 200:
-                score += 0.2
-            elif vessel_type == 'submarine' and 100 <= centroid <= 300:
-                score += 0.2
-            elif vessel_type == 'boat' and 100 <= centroid <= 500:
-                score += 0.2
-            elif vessel_type == 'rov' and centroid > 2000:
-                score += 0.2
-            elif vessel_type == 'auv' and 300 <= centroid <= 1000:
-                score += 0.2
-            
-            # 3. Кавитационный уровень
-            cavitation = features['cavitation_level']
-            
-            if vessel_type == 'submarine' and cavitation > 0.3:
-                score += 0.3
-            elif vessel_type == 'boat' and 0.1 <= cavitation <= 0.4:
-                score += 0.2
-            elif vessel_type == 'ship' and cavitation < 0.1:
-                score += 0.1
-            
-            # 4. Количество гармоник
-            num_harmonics = len([p for p in features.get('peak_freqs', []) 
-                               if p < 500 and p > 0])
-            
-            if vessel_type == 'ship' and num_harmonics >= 3:
-                score += 0.2
-            elif vessel_type == 'rov' and num_harmonics < 3:
-                score += 0.2
-            
-            scores[vessel_type] = score
-        
-        # Выбрать тип с максимальным скором
-        best_vessel = max(scores, key=scores.get)
-        best_score = scores[best_vessel]
+        # Выбрать тип с максимальным скором (при равенстве - первый по таблице)
+        best = int(np.argmax(scores))
+        best_vessel = self._VESSEL_NAMES[best]
+        best_score = float(scores[best])
         
         # Нормализовать скор в 0-1
         confidence = min(best_score / 1.0, 1.0)
@@ -340,17 +510,34 @@ class PropellerSignatureClassifier:
         
         return threat
     
-    def _smooth_classification(self, history: list) -> VesselClassification:
+    def _record_classification(self, classification: VesselClassification):
         """
-        Сгладить классификацию используя историю
+        Записать классификацию в кольцевой буфер истории (O(1), без сдвига)
         
         Args:
-            history: История последних классификаций
+            classification: Классификация текущего кадра
+        """
+        head = self._hist_head
+        column = self._hist_values[:, head]
+        column[_H_CONF] = classification.confidence
+        column[_H_RPM] = classification.propeller_rpm_estimate
+        column[_H_CAV] = classification.cavitation_level
+        column[_H_THREAT] = classification.threat_level
+        column[_H_BLADES] = classification.blade_count_estimate
+        self._hist_types.append(classification.vessel_type)
+        
+        self._hist_head = (head + 1) % _HISTORY_LEN
+        self._hist_fill = min(self._hist_fill + 1, _HISTORY_LEN)
+    
+    def _smooth_classification(self) -> VesselClassification:
+        """
+        Сгладить классификацию используя историю последних кадров
         
         Returns:
             VesselClassification: Сглаженная классификация
         """
-        if not history:
+        fill = self._hist_fill
+        if fill == 0:
             return VesselClassification(
                 vessel_type='unknown',
                 confidence=0,
@@ -361,18 +548,18 @@ class PropellerSignatureClassifier:
             )
         
         # Найти наиболее частый тип судна
-        vessel_types = [c.vessel_type for c in history]
-        most_common = max(set(vessel_types), key=vessel_types.count)
+        # (Counter - один проход; при равенстве - тип, встреченный раньше)
+        most_common = Counter(self._hist_types).most_common(1)[0][0]
         
-        # Среднее значение параметров
-        avg_confidence = np.mean([c.confidence for c in history])
-        avg_rpm = np.mean([c.propeller_rpm_estimate for c in history])
-        avg_cavitation = np.mean([c.cavitation_level for c in history])
-        avg_threat = int(np.mean([c.threat_level for c in history]))
+        # Среднее значение параметров: одна редукция по строкам буфера
+        values = self._hist_values[:, :fill]
+        avg_confidence, avg_rpm, avg_cavitation, avg_threat = values[:_H_BLADES].mean(axis=1).tolist()
+        avg_threat = int(avg_threat)
         
         # Использовать среднее количество лопастей
-        blade_counts = [c.blade_count_estimate for c in history if c.blade_count_estimate > 0]
-        avg_blades = int(np.mean(blade_counts)) if blade_counts else 0
+        blade_counts = values[_H_BLADES]
+        blade_counts = blade_counts[blade_counts > 0]
+        avg_blades = int(blade_counts.mean()) if blade_counts.size else 0
         
         return VesselClassification(
             vessel_type=most_common,
@@ -1,15 +1,138 @@
 # sensor_fusion.py
 # Модуль слияния данных SONAR и HYDROPHONE для обнаружения винтов
 
+import math
 import numpy as np
-from scipy import signal
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+from numba import njit
+
+from spectrum import SpectrumFrame, compute_spectrum, find_spectral_peaks
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("SensorFusion")
 
+
+# Ядра EKF для модели постоянной скорости: состояние [x, y, z, vx, vy, vz],
+# P - блоки 3x3 [[pp, pv], [vp, vv]]. Матрицы F и H не строятся: их
+# структура (F = [[I, dt*I], [0, I]], H = [I, 0]) раскрыта в формулах.
+
+@njit('void(float64[::1], float64[:, ::1], float64[:, ::1], float64)', cache=True)
+def _ekf_predict(x, P, Q, dt):
+    """
+    Прогноз x = F x, P = F P F^T + Q на месте
+    
+    Args:
+        x: Вектор состояния [6]
+        P: Ковариация [6, 6]
+        Q: Ковариация шума процесса [6, 6]
+        dt: Шаг времени (с)
+    """
+    for i in range(3):
+        x[i] += dt * x[i + 3]
+    
+    # pp' = pp + dt*(pv + vp) + dt^2*vv (читает только ещё не изменённые блоки)
+    dt2 = dt * dt
+    for i in range(3):
+        for j in range(3):
+            P[i, j] += dt * (P[i, j + 3] + P[i + 3, j]) + dt2 * P[i + 3, j + 3]
+    
+    # pv' = pv + dt*vv, vp' = vp + dt*vv, vv' = vv
+    for i in range(3):
+        for j in range(3):
+            P[i, j + 3] += dt * P[i + 3, j + 3]
+            P[i + 3, j] += dt * P[i + 3, j + 3]
+    
+    for i in range(6):
+        for j in range(6):
+            P[i, j] += Q[i, j]
+
+
+@njit('void(float64[::1], float64[:, ::1], float64, float64, float64, float64, float64[:, ::1])',
+      cache=True)
+def _ekf_update_position(x, P, zx, zy, zz, r, K):
+    """
+    Обновление по измерению позиции (H = [I, 0], R = r*I) на месте
+    
+    S = pp + r*I обращается аналитически через присоединённую матрицу;
+    единичные матрицы и промежуточные массивы не создаются.
+    
+    Args:
+        x: Вектор состояния [6]
+        P: Ковариация [6, 6]
+        zx, zy, zz: Измеренная позиция (м)
+        r: Дисперсия шума измерения
+        K: Рабочий буфер усиления Калмана [6, 3]
+    """
+    s00 = P[0, 0] + r
+    s01 = P[0, 1]
+    s02 = P[0, 2]
+    s10 = P[1, 0]
+    s11 = P[1, 1] + r
+    s12 = P[1, 2]
+    s20 = P[2, 0]
+    s21 = P[2, 1]
+    s22 = P[2, 2] + r
+    
+    c00 = s11 * s22 - s12 * s21
+    c01 = s02 * s21 - s01 * s22
+    c02 = s01 * s12 - s02 * s11
+    inv_det = 1.0 / (s00 * c00 + s10 * c01 + s20 * c02)
+    
+    # S^-1 построчно
+    i00 = c00 * inv_det
+    i01 = c01 * inv_det
+    i02 = c02 * inv_det
+    i10 = (s12 * s20 - s10 * s22) * inv_det
+    i11 = (s00 * s22 - s02 * s20) * inv_det
+    i12 = (s02 * s10 - s00 * s12) * inv_det
+    i20 = (s10 * s21 - s11 * s20) * inv_det
+    i21 = (s01 * s20 - s00 * s21) * inv_det
+    i22 = (s00 * s11 - s01 * s10) * inv_det
+    
+    # K = P[:, :3] @ S^-1
+    for i in range(6):
+        p0 = P[i, 0]
+        p1 = P[i, 1]
+        p2 = P[i, 2]
+        K[i, 0] = p0 * i00 + p1 * i10 + p2 * i20
+        K[i, 1] = p0 * i01 + p1 * i11 + p2 * i21
+        K[i, 2] = p0 * i02 + p1 * i12 + p2 * i22
+    
+    y0 = zx - x[0]
+    y1 = zy - x[1]
+    y2 = zz - x[2]
+    for i in range(6):
+        x[i] += K[i, 0] * y0 + K[i, 1] * y1 + K[i, 2] * y2
+    
+    # P = (I - K H) P = P - K @ P[:3, :]; по столбцам, чтобы верхние строки
+    # столбца читались до его изменения (без копии P[:3, :])
+    for j in range(6):
+        t0 = P[0, j]
+        t1 = P[1, j]
+        t2 = P[2, j]
+        for i in range(6):
+            P[i, j] -= K[i, 0] * t0 + K[i, 1] * t1 + K[i, 2] * t2
+
+
+@njit('void(float64[::1], float64[:, ::1], float64, float64)', cache=True)
+def _ekf_update_vx(x, P, z, r):
+    """
+    Обновление состояния по измерению скорости vx (H = [0, 0, 0, 1, 0, 0])
+    
+    Как и прежде, ковариация этим измерением не уточняется.
+    
+    Args:
+        x: Вектор состояния [6]
+        P: Ковариация [6, 6]
+        z: Измеренная скорость vx (м/с)
+        r: Дисперсия шума измерения
+    """
+    gain = (z - x[3]) / (P[3, 3] + r)
+    for i in range(6):
+        x[i] += P[i, 3] * gain
+
 @dataclass
 class FusedState:
     """Объединённое состояние угрозы от датчиков"""
@@ -45,20 +168,13 @@ class ExtendedKalmanFilter:
         self.R_sonar = measurement_noise_sonar
         self.R_acoustic = measurement_noise_acoustic
         
+        # Рабочий буфер усиления Калмана для обновления по SONAR
+        self._K = np.empty((6, 3))
+        
     def predict(self, dt=0.1):
         """Прогноз Калмана на основе физической модели"""
-        # Матрица переходов (движение в пространстве)
-        F = np.array([
-            [1, 0, 0, dt, 0, 0],
-            [0, 1, 0, 0, dt, 0],
-            [0, 0, 1, 0, 0, dt],
-            [0, 0, 0, 1, 0, 0],
-            [0, 0, 0, 0, 1, 0],
-            [0, 0, 0, 0, 0, 1]
-        ])
-        
-        self.x = F @ self.x
-        self.P = F @ self.P @ F.T + self.Q
+        # Движение с постоянной скоростью (F раскрыта в _ekf_predict)
+        _ekf_predict(self.x, self.P, self.Q, dt)
         
         logger.debug(f"EKF Predict: x={self.x[:3]}, v={self.x[3:6]}")
     
@@ -73,27 +189,15 @@ class ExtendedKalmanFilter:
             elevation_rad: Возвышение в радианах
         """
         # Преобразование из сферических в декартовы координаты
-        x_meas = distance * np.cos(elevation_rad) * np.cos(azimuth_rad)
-        y_meas = distance * np.cos(elevation_rad) * np.sin(azimuth_rad)
-        z_meas = distance * np.sin(elevation_rad)
-        
-        z = np.array([x_meas, y_meas, z_meas])
-        
-        # Матрица измерения (только позиция)
-        H = np.array([
-            [1, 0, 0, 0, 0, 0],
-            [0, 1, 0, 0, 0, 0],
-            [0, 0, 1, 0, 0, 0]
-        ])
+        horizontal = distance * math.cos(elevation_rad)
+        x_meas = horizontal * math.cos(azimuth_rad)
+        y_meas = horizontal * math.sin(azimuth_rad)
+        z_meas = distance * math.sin(elevation_rad)
         
-        y = z - (H @ self.x)
-        S = H @ self.P @ H.T + self.R_sonar * np.eye(3)
-        K = self.P @ H.T @ np.linalg.inv(S)
+        # Измеряется только позиция (H = [I, 0], S обращается аналитически)
+        _ekf_update_position(self.x, self.P, x_meas, y_meas, z_meas, self.R_sonar, self._K)
         
-        self.x = self.x + K @ y
-        self.P = (np.eye(6) - K @ H) @ self.P
-        
-        logger.debug(f"SONAR Update: dist={distance:.1f}m, az={np.degrees(azimuth_rad):.1f}°")
+        logger.debug(f"SONAR Update: dist={distance:.1f}m, az={math.degrees(azimuth_rad):.1f}°")
     
     def update_acoustic(self, frequency_peaks: np.ndarray):
         """
@@ -113,31 +217,24 @@ class ExtendedKalmanFilter:
             doppler_shift = (bpf_freq - expected_bpf) / expected_bpf
             estimated_velocity = doppler_shift * 1500  # м/с
             
-            # Обновляем компоненту скорости
-            H_v = np.array([[0, 0, 0, 1, 0, 0]])  # Только Vx
-            z_v = np.array([estimated_velocity])
-            
-            y_v = z_v - (H_v @ self.x)
-            S_v = H_v @ self.P @ H_v.T + self.R_acoustic
-            K_v = self.P @ H_v.T / S_v
-            
-            self.x = self.x + K_v.flatten() * y_v
+            # Обновляем компоненту скорости (только Vx)
+            _ekf_update_vx(self.x, self.P, estimated_velocity, self.R_acoustic)
             
             logger.debug(f"Acoustic Update: BPF={bpf_freq:.1f}Hz, est_v={estimated_velocity:.2f}m/s")
     
     def get_state_estimate(self) -> FusedState:
         """Получить оценённое состояние"""
-        x_pos, y_pos, z_pos = self.x[:3]
-        vx, vy, vz = self.x[3:6]
+        # Скаляры состояния как float: дальше только math, без ufunc NumPy
+        x_pos, y_pos, z_pos, vx, vy, vz = self.x.tolist()
         
         # Расстояние
-        distance = np.sqrt(x_pos**2 + y_pos**2 + z_pos**2)
+        distance = math.sqrt(x_pos**2 + y_pos**2 + z_pos**2)
         
         # Азимут (0-360°)
-        azimuth = np.degrees(np.arctan2(y_pos, x_pos)) % 360
+        azimuth = math.degrees(math.atan2(y_pos, x_pos)) % 360
         
-        # Возвышение (-90 to +90°)
-        elevation = np.degrees(np.arcsin(z_pos / max(distance, 1)))
+        # Возвышение (-90 to +90°); синус ограничен [-1, 1] от погрешности округления
+        elevation = math.degrees(math.asin(max(-1.0, min(1.0, z_pos / max(distance, 1)))))
         
         # Скорость сближения (положительная = приближается)
         closing_speed = -(vx * x_pos + vy * y_pos + vz * z_pos) / max(distance, 1)
@@ -186,6 +283,20 @@ class SensorFusionEngine:
             }
             acoustic_data: Буфер аудиосигнала (PCM samples)
         
+        Returns:
+            FusedState: Объединённое состояние угрозы
+        """
+        return self.fuse_from_spectrum(sonar_data, compute_spectrum(acoustic_data))
+    
+    def fuse_from_spectrum(self, sonar_data: Dict,
+                           spectrum: Optional[SpectrumFrame]) -> FusedState:
+        """
+        Объединение данных SONAR с уже вычисленным спектром гидрофона
+        
+        Args:
+            sonar_data: Данные SONAR (см. fuse_sonar_hydrophone)
+            spectrum: SpectrumFrame из spectrum.compute_spectrum (None - нет данных)
+        
         Returns:
             FusedState: Объединённое состояние угрозы
         """
@@ -196,12 +307,12 @@ class SensorFusionEngine:
         if sonar_data:
             self.ekf.update_sonar(
                 distance=sonar_data.get('distance', 100),
-                azimuth_rad=np.radians(sonar_data.get('azimuth', 0)),
-                elevation_rad=np.radians(sonar_data.get('elevation', 0))
+                azimuth_rad=math.radians(sonar_data.get('azimuth', 0)),
+                elevation_rad=math.radians(sonar_data.get('elevation', 0))
             )
         
-        # Шаг 3: FFT анализ гидрофона
-        frequency_peaks = self._compute_fft(acoustic_data)
+        # Шаг 3: Пики спектра гидрофона
+        frequency_peaks = self._extract_peaks(spectrum)
         
         # Шаг 4: Обновление на основе акустики
         if frequency_peaks is not None:
@@ -223,47 +334,40 @@ class SensorFusionEngine:
         
         return fused_state
     
-    def _compute_fft(self, audio_buffer: np.ndarray, sample_rate: int = 48000) -> np.ndarray:
+    def _extract_peaks(self, spectrum: Optional[SpectrumFrame]) -> np.ndarray:
         """
-        Вычислить FFT и извлечь пики частот (сигнатура винта)
+        Извлечь пики частот из спектра кадра (сигнатура винта)
         
         Args:
-            audio_buffer: Буфер аудиоданных
-            sample_rate: Частота дискретизации (Гц)
+            spectrum: SpectrumFrame (окно Ханна, нормализация на максимум)
         
         Returns:
             np.ndarray: Массив пиков [(freq, power), ...]
         """
-        if audio_buffer is None or len(audio_buffer) < 512:
+        if spectrum is None:
             return None
         
-        # Применить окно Ханна для уменьшения утечки
-        windowed = audio_buffer * signal.windows.hann(len(audio_buffer))
-        
-        # FFT
-        freqs = np.fft.rfftfreq(len(windowed), 1/sample_rate)
-        fft_vals = np.abs(np.fft.rfft(windowed))
+        freqs = spectrum.freqs
+        fft_vals = spectrum.power
         
-        # Нормализация
-        fft_vals = fft_vals / np.max(fft_vals) if np.max(fft_vals) > 0 else fft_vals
-        
-        # Найти пики (используем scipy.signal.find_peaks)
-        peaks, properties = signal.find_peaks(
-            fft_vals, height=0.1, distance=10, prominence=0.05
-        )
+        # Найти пики (компилированный аналог scipy.signal.find_peaks)
+        peaks = find_spectral_peaks(fft_vals, 0.1, 10, 0.05)
         
         # Вернуть топ-5 пиков отсортированных по мощности
         if len(peaks) > 0:
             peak_freqs = freqs[peaks]
             peak_powers = fft_vals[peaks]
             
-            # Отсортировать по мощности (descending)
-            sorted_idx = np.argsort(peak_powers)[::-1][:5]
+            # Топ-5 по мощности: отбор за O(M) через argpartition,
+            # сортируются (descending) только отобранные
+            k = min(5, peak_powers.size)
+            top = np.argpartition(peak_powers, -k)[-k:]
+            sorted_idx = top[np.argsort(peak_powers[top])[::-1]]
             
-            result = np.array([
-                [peak_freqs[i], peak_powers[i]] 
-                for i in sorted_idx
-            ])
+            # Одна непрерывная матрица [freq, power] без списка Python-объектов
+            result = np.empty((sorted_idx.size, 2), dtype=np.float32)
+            result[:, 0] = peak_freqs[sorted_idx]
+            result[:, 1] = peak_powers[sorted_idx]
             
             logger.debug(f"FFT Peaks: {result[:3]}")
             return result
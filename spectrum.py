@@ -0,0 +1,262 @@
+# spectrum.py
+# Общие спектральные таблицы для анализа гидрофона (окно, сетка частот)
+
+import numpy as np
+from scipy import fft, signal
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+from numba import njit, prange
+
+# Масштаб PCM int16 -> float32 (-1.0 до 1.0)
+_PCM_SCALE = np.float32(1 / 32768)
+
+
+@dataclass
+class SpectrumFrame:
+    """Амплитудный спектр кадра гидрофона, общий для слияния и классификации"""
+    freqs: np.ndarray        # Частоты бинов (Гц), float32, только для чтения
+    power: np.ndarray        # Амплитудный спектр float32, нормализованный на максимум
+    sample_rate: int         # Частота дискретизации (Гц)
+
+
+@lru_cache(maxsize=8)
+def hann_window(n: int) -> np.ndarray:
+    """
+    Окно Ханна длины n (кэшируется по длине буфера)
+    
+    Массив только для чтения: умножение на него создаёт новый буфер,
+    поэтому кэш не может быть испорчен вызывающим кодом.
+    
+    Args:
+        n: Длина буфера (сэмплы)
+    
+    Returns:
+        np.ndarray: Окно float32 длины n
+    """
+    window = signal.windows.hann(n).astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+@lru_cache(maxsize=8)
+def rfft_freqs(n: int, sample_rate: int) -> np.ndarray:
+    """
+    Частоты бинов rfft для буфера длины n (кэшируется по (n, sample_rate))
+    
+    Args:
+        n: Длина буфера (сэмплы)
+        sample_rate: Частота дискретизации (Гц)
+    
+    Returns:
+        np.ndarray: Частоты float32 длины n // 2 + 1, только для чтения
+    """
+    freqs = fft.rfftfreq(n, 1/sample_rate).astype(np.float32)
+    freqs.setflags(write=False)
+    return freqs
+
+
+@njit(cache=True, fastmath=True)
+def _window_norm(x, w, scale, out):
+    """
+    Нормализация и окно Ханна за один проход по буферу
+    
+    Args:
+        x: Аудиосэмплы (int16 или float)
+        w: Окно float32 той же длины
+        scale: Масштаб нормализации float32
+        out: Выходной буфер float32 той же длины
+    """
+    for i in range(x.size):
+        out[i] = np.float32(x[i]) * w[i] * scale
+
+
+@njit(cache=True, fastmath=True)
+def _normalized_magnitude(c, out):
+    """
+    Модуль комплексного спектра, нормализованный на максимум
+    
+    Максимум отслеживается в том же проходе, что и модуль; затем буфер
+    делится на него на месте (нулевой спектр остаётся как есть).
+    
+    Args:
+        c: Комплексный спектр complex64
+        out: Выходной буфер float32 той же длины
+    """
+    peak = np.float32(0)
+    for i in range(c.size):
+        re = c[i].real
+        im = c[i].imag
+        m = np.sqrt(re * re + im * im)
+        out[i] = m
+        if m > peak:
+            peak = m
+    
+    if peak > 0:
+        for i in range(out.size):
+            out[i] /= peak
+
+
+@njit(cache=True, parallel=True)
+def _normalized_magnitude_rows(c, out):
+    """
+    _normalized_magnitude для каждой строки пакета спектров (параллельно)
+    
+    Args:
+        c: Комплексные спектры complex64 (B, n_bins)
+        out: Выходной буфер float32 (B, n_bins)
+    """
+    for b in prange(c.shape[0]):
+        _normalized_magnitude(c[b], out[b])
+
+
+def compute_spectra(buffers: np.ndarray,
+                    sample_rate: int = 48000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Нормализованные амплитудные спектры пакета буферов одной длины
+    
+    Пакетный вариант compute_spectrum для многоканального гидрофона:
+    окно применяется ко всей матрице, rfft считается по последней оси
+    на всех ядрах (workers=-1), модуль и нормализация - по строкам.
+    
+    Args:
+        buffers: Матрица аудиоданных (B, N), PCM int16 или float
+        sample_rate: Частота дискретизации (Гц)
+    
+    Returns:
+        tuple: (частоты float32 [N // 2 + 1], спектры float32 [B, N // 2 + 1])
+    """
+    n = buffers.shape[1]
+    scale = _PCM_SCALE if buffers.dtype == np.int16 else np.float32(1)
+    windowed = np.multiply(buffers, hann_window(n) * scale, dtype=np.float32)
+    
+    spectra = fft.rfft(windowed, axis=-1, workers=-1)
+    power = np.empty(spectra.shape, dtype=np.float32)
+    _normalized_magnitude_rows(spectra, power)
+    
+    return rfft_freqs(n, sample_rate), power
+
+
+def compute_spectrum(audio_buffer: np.ndarray, sample_rate: int = 48000,
+                     work: Optional[np.ndarray] = None,
+                     out: Optional[np.ndarray] = None) -> Optional[SpectrumFrame]:
+    """
+    Вычислить нормализованный амплитудный спектр буфера гидрофона
+    
+    Считается один раз на кадр и передаётся и в слияние датчиков, и в
+    классификатор винтов.
+    
+    Args:
+        audio_buffer: Буфер аудиоданных (PCM int16 или float)
+        sample_rate: Частота дискретизации (Гц)
+        work: Буфер float32 длины len(audio_buffer) под окно; если не
+              задан или другой длины - выделяется на вызов
+        out: Буфер float32 длины len(audio_buffer) // 2 + 1 под спектр
+             (становится SpectrumFrame.power, поэтому переиспользовать его
+             можно только когда кадр не хранится дольше следующего вызова);
+             если не задан или другой длины - выделяется на вызов
+    
+    Returns:
+        SpectrumFrame: Спектр кадра или None, если буфер короче 512 сэмплов
+    """
+    if audio_buffer is None or len(audio_buffer) < 512:
+        return None
+    
+    n = len(audio_buffer)
+    if work is None or work.size != n:
+        work = np.empty(n, dtype=np.float32)
+    
+    # Нормализация в float32 и окно Ханна одним проходом
+    scale = _PCM_SCALE if audio_buffer.dtype == np.int16 else np.float32(1)
+    _window_norm(audio_buffer, hann_window(n), scale, work)
+    
+    # FFT (scipy.fft: pocketfft с SIMD и кэшем планов по длине); вход float32,
+    # поэтому преобразование идёт в complex64, а спектр сразу float32.
+    # scipy.fft не принимает выходной буфер, модуль с нормализацией на
+    # максимум пишется в out ядром
+    n_bins = n // 2 + 1
+    power = out if out is not None and out.size == n_bins else np.empty(n_bins, dtype=np.float32)
+    _normalized_magnitude(fft.rfft(work), power)
+    
+    return SpectrumFrame(freqs=rfft_freqs(n, sample_rate), power=power,
+                         sample_rate=sample_rate)
+
+
+@njit(cache=True)
+def find_spectral_peaks(x, height, distance, prominence):
+    """
+    Пики спектра с порогами высоты, расстояния и выраженности
+    
+    Компилированная замена scipy.signal.find_peaks(x, height=..., distance=...,
+    prominence=...) с той же семантикой (плато -> середина, фильтры применяются
+    в порядке высота -> расстояние -> выраженность), но без словаря свойств.
+    
+    Args:
+        x: Спектр (1-D)
+        height: Минимальная высота пика
+        distance: Минимальное расстояние между пиками (бины)
+        prominence: Минимальная выраженность пика
+    
+    Returns:
+        np.ndarray: Индексы пиков int64 по возрастанию
+    """
+    n = x.shape[0]
+    peaks = np.empty(n // 2 + 1, dtype=np.int64)
+    count = 0
+    
+    # 1. Локальные максимумы (для плато - середина) с порогом высоты
+    i = 1
+    while i < n - 1:
+        if x[i - 1] < x[i]:
+            i_ahead = i + 1
+            while i_ahead < n - 1 and x[i_ahead] == x[i]:
+                i_ahead += 1
+            if x[i_ahead] < x[i]:
+                peak = (i + i_ahead - 1) // 2
+                if x[peak] >= height:
+                    peaks[count] = peak
+                    count += 1
+                i = i_ahead
+        i += 1
+    
+    # 2. Расстояние: более высокие пики подавляют соседей ближе distance
+    keep = np.ones(count, dtype=np.bool_)
+    min_dist = np.ceil(distance)
+    order = np.argsort(x[peaks[:count]], kind='mergesort')  # равные высоты - по индексу
+    for o in range(count - 1, -1, -1):
+        j = order[o]
+        if not keep[j]:
+            continue
+        k = j - 1
+        while k >= 0 and peaks[j] - peaks[k] < min_dist:
+            keep[k] = False
+            k -= 1
+        k = j + 1
+        while k < count and peaks[k] - peaks[j] < min_dist:
+            keep[k] = False
+            k += 1
+    
+    # 3. Выраженность: высота над выше лежащим из двух минимумов по сторонам
+    kept = 0
+    for j in range(count):
+        if not keep[j]:
+            continue
+        peak = peaks[j]
+        top = x[peak]
+        left_min = top
+        i = peak
+        while i >= 0 and x[i] <= top:
+            if x[i] < left_min:
+                left_min = x[i]
+            i -= 1
+        right_min = top
+        i = peak
+        while i < n and x[i] <= top:
+            if x[i] < right_min:
+                right_min = x[i]
+            i += 1
+        if top - max(left_min, right_min) >= prominence:
+            peaks[kept] = peak
+            kept += 1
+    
+    return peaks[:kept]
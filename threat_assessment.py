@@ -4,23 +4,402 @@
 import numpy as np
 from dataclasses import dataclass
 import logging
-from typing import Dict
+import math
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from numba import njit, prange
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("ThreatAssessment")
 
-@dataclass
+# Коды типов судов (индекс в VESSEL_TYPES) для ядра оценки и пакетной оценки.
+# Тип переводится в код один раз, поиском в VESSEL_IDS; классификатор отдаёт
+# те же интернированные литералы, поэтому ключ находится по идентичности
+# объекта, без посимвольного сравнения строк
+SUBMARINE, SHIP, BOAT, ROV, AUV, UNKNOWN = range(6)
+VESSEL_TYPES = ('submarine', 'ship', 'boat', 'rov', 'auv', 'unknown')
+VESSEL_IDS = {name: i for i, name in enumerate(VESSEL_TYPES)}
+
+# TTC цели, которая не сближается: конечное значение вместо inf, чтобы
+# сравнения и min/max в ядрах (в том числе с fastmath) оставались корректны.
+# Потребителям: TTC >= 1e8 - "не сближается"
+TTC_SENTINEL: float = 1.0e9
+
+# Целевая запись пакетной оценки: столбцы FusedState + VesselClassification.
+# Вещественные поля - float64, как у скалярных входов: без понижения точности
+# значения у границ ступеней TTC и секторов оцениваются так же, как в assess_threat
+THREAT_INPUT_DTYPE = np.dtype([
+    ('distance', 'f8'),
+    ('azimuth', 'f8'),
+    ('elevation', 'f8'),
+    ('closing_speed', 'f8'),
+    ('vessel_id', 'u1'),
+    ('cavitation', 'f8'),
+])
+
+# История последних оценок: кольцевой буфер записей THREAT_DTYPE
+# (поля ThreatAssessment в том же порядке)
+_HISTORY_LEN = 10
+THREAT_DTYPE = np.dtype([
+    ('distance_m', 'f8'),
+    ('azimuth_deg', 'f8'),
+    ('elevation_deg', 'f8'),
+    ('closing_speed_mps', 'f8'),
+    ('time_to_collision_s', 'f8'),
+    ('risk_level', 'i4'),
+    ('vessel_type', 'U10'),
+    ('threat_probability', 'f8'),
+    ('reco', 'O'),
+])
+
+# Направление угрозы по сектору азимута: [315, 45), [45, 135), [135, 225), [225, 315)
+_DIR_TABLE = ("спереди", "справа (старборд)", "сзади", "слева (порт)")
+
+# Шаблоны рекомендаций по ступени риска: нет угрозы, низкий, средний,
+# высокий (подготовка), высокий при TTC < 10 с, критичный
+_RECO_TEMPLATES = (
+    "🟢 Судно обнаружено {dir}, но опасности нет.",
+    "🟡 НИЗКИЙ РИСК: {vessel} обнаружен {dir}. Будьте внимательны.",
+    "🟠 СРЕДНИЙ РИСК: {vessel} на расстоянии, {dir}. Мониторьте.",
+    "🟡 РИСК: {vessel} обнаружен {dir}. Подготовьтесь к манёвру.",
+    "🔴 ВЫСОКИЙ РИСК! {vessel} приближается {dir} (TTC {ttc:.1f}s). УХОДИТЕ!",
+    "⚠️⚠️ КРИТИЧНО! {vessel} закрывается {dir} со скоростью! УХОДИТЕ НЕМЕДЛЕННО!",
+)
+_RECO_URGENT = 4
+_RECO_CRITICAL = 5
+
+# Ступень рекомендации по уровню риска 0-10 (>=9, >=7, >=5, >=3, остальное)
+_RISK_TIER = (0, 0, 0, 1, 1, 2, 2, 3, 3, 5, 5)
+
+# Скорость и срочность манёвра уклонения по ступени риска (<5, 5-6, 7-8, >=9)
+_SPEED_TABLE = np.array([40, 60, 80, 100], dtype=np.int8)
+_URGENCY_TABLE = np.array(['slow', 'normal', 'fast', 'emergency'])
+
+# Поправки риска по коду судна (порядок VESSEL_TYPES):
+# постоянная добавка, +1 при скорости сближения выше порога,
+# +1 при кавитации выше порога, кавитация выше порога -> риск 10
+_RISK_BONUS = np.array([2, 0, 0, -1, -1, 0], dtype=np.int32)
+_RISK_SPEED_LIMIT = np.array([np.inf, 5, 3, np.inf, np.inf, np.inf], dtype=np.float64)
+_RISK_CAV_LIMIT = np.array([np.inf, np.inf, 0.2, np.inf, np.inf, np.inf], dtype=np.float64)
+_RISK_CRITICAL_CAV = np.array([0.3, np.inf, np.inf, np.inf, np.inf, np.inf], dtype=np.float64)
+
+# Множитель вероятности угрозы по коду судна: подлодки опаснее, ROV/AUV менее
+_VESSEL_PROB_MUL = np.array([1.3, 1.0, 1.0, 0.5, 0.5, 1.0], dtype=np.float64)
+
+# Нечёткая модель индекса риска столкновения (CRI): границы функций
+# принадлежности DCPA (м), TCPA (с), дистанции (м) и скорости сближения (м/с)
+_CRI_DCPA = (5.0, 20.0)
+_CRI_TCPA = (5.0, 120.0)
+_CRI_RANGE = (10.0, 300.0)
+_CRI_SPEED_MAX = 10.0
+_CRI_BEARING_BIAS = math.radians(19.0)  # Угроза справа по носу опаснее (МППСС)
+
+# Веса CRI по умолчанию: CPA, пеленг, дистанция, скорость (сумма = 1)
+CRI_WEIGHTS = (0.4, 0.2, 0.2, 0.2)
+
+# Модели риска ThreatAssessmentEngine: ступени TTC с поправками по типу судна
+# и нечёткий индекс риска столкновения
+RISK_MODELS = ('ttc', 'cri')
+
+
+class RecoCode(NamedTuple):
+    """Рекомендация для дайвера в машинном виде; текст - reco_to_str"""
+    tier: int          # Ступень рекомендации (индекс _RECO_TEMPLATES)
+    vessel_type: str   # Тип судна
+    dir_idx: int       # Сектор азимута (индекс _DIR_TABLE)
+    ttc: float         # TTC, округлённое до 0.1 с (0 для ступеней без TTC в тексте)
+
+
+def classify_reco(risk_level: int, vessel_type: str, azimuth: float, ttc: float) -> RecoCode:
+    """
+    Рекомендация для дайвера без форматирования текста
+    
+    Args:
+        risk_level: Уровень риска 1-10
+        vessel_type: Тип судна
+        azimuth: Азимут угрозы в градусах; приводится к [0, 360), поэтому
+                 отрицательные и >= 360° азимуты дают сектор того же
+                 направления (-10° и 350° - спереди, 370° - как 10°)
+        ttc: Время до столкновения
+    
+    Returns:
+        RecoCode: Ступень, судно, сектор и TTC рекомендации
+    """
+    # Направление: азимут в [0, 360), сектор по 90°, начиная с -45°
+    azimuth %= 360.0
+    dir_idx = int((azimuth + 45) % 360) // 90
+    
+    # Ступень рекомендации; высокий риск при TTC < 10 с - срочная.
+    # TTC выводится только в срочной, с точностью 0.1 с - код квантуется
+    # так же, и текст совпадает с неквантованным
+    tier = _RISK_TIER[min(max(risk_level, 0), 10)]
+    if tier == _RECO_URGENT - 1 and ttc < 10:
+        return RecoCode(_RECO_URGENT, vessel_type, dir_idx, round(max(ttc, 0.0), 1))
+    return RecoCode(tier, vessel_type, dir_idx, 0.0)
+
+
+@lru_cache(maxsize=512)
+def reco_to_str(code: RecoCode) -> str:
+    """
+    Текст рекомендации для дайвера (кэшируется по коду)
+    
+    Args:
+        code: Код рекомендации (см. classify_reco)
+    
+    Returns:
+        str: Рекомендация для дайвера
+    """
+    vessel = code.vessel_type.upper() if code.tier == _RECO_CRITICAL else code.vessel_type
+    return _RECO_TEMPLATES[code.tier].format(vessel=vessel, dir=_DIR_TABLE[code.dir_idx],
+                                             ttc=code.ttc)
+
+
+def threat_inputs(fused_states: Sequence, vessel_classifications: Sequence) -> np.ndarray:
+    """
+    Упаковать пары (FusedState, VesselClassification) в массив THREAT_INPUT_DTYPE
+    
+    Тип судна кодируется в vessel_id один раз при упаковке; неизвестные
+    типы получают код 'unknown'.
+    
+    Args:
+        fused_states: FusedState из sensor_fusion.py, по одному на цель
+        vessel_classifications: VesselClassification той же длины
+    
+    Returns:
+        np.ndarray: Структурированный массив целей (N,)
+    """
+    targets = np.empty(len(fused_states), dtype=THREAT_INPUT_DTYPE)
+    for i, (state, vessel) in enumerate(zip(fused_states, vessel_classifications)):
+        targets[i] = (state.distance, state.azimuth, state.elevation,
+                      state.closing_speed,
+                      VESSEL_IDS.get(vessel.vessel_type, UNKNOWN),
+                      vessel.cavitation_level)
+    return targets
+
+
+@njit(cache=True)
+def _score_kernel(distance, ttc, closing_speed, vessel_id, cavitation):
+    """
+    Уровень риска и вероятность угрозы одной цели (компилированное ядро)
+    
+    Объединяет ступени TTC, модуляцию риска по типу судна и расчёт
+    вероятности угрозы без словарей и сравнений строк.
+    
+    Args:
+        distance: Расстояние в метрах
+        ttc: Время до столкновения в секундах (TTC_SENTINEL - не сближается)
+        closing_speed: Скорость сближения м/с
+        vessel_id: Код типа судна (SUBMARINE ... UNKNOWN)
+        cavitation: Уровень кавитации 0-1
+    
+    Returns:
+        tuple: (уровень риска 1-10, вероятность угрозы 0-1)
+    """
+    # Базовый уровень риска из TTC
+    if ttc < 5.0:
+        risk = 10
+    elif ttc < 15.0:
+        risk = 8
+    elif ttc < 30.0:
+        risk = 6
+    elif ttc < 60.0:
+        risk = 4
+    elif ttc < 120.0:
+        risk = 2
+    else:
+        risk = 1
+    
+    # Поправка по типу судна из таблиц: подлодка +2, корабль +1 за скорость
+    # выше 5 м/с, лодка +1 за скорость выше 3 м/с и +1 за кавитацию, ROV/AUV -1.
+    # У каждого типа все добавки одного знака, поэтому одно насыщение 1..10
+    # в конце эквивалентно промежуточным min/max
+    risk += (_RISK_BONUS[vessel_id]
+             + (closing_speed > _RISK_SPEED_LIMIT[vessel_id])
+             + (cavitation > _RISK_CAV_LIMIT[vessel_id]))
+    risk = 10 if risk > 10 else risk
+    risk = 1 if risk < 1 else risk
+    
+    # Кавитирующая подводная лодка - критично
+    if cavitation > _RISK_CRITICAL_CAV[vessel_id]:
+        risk = 10
+    
+    # Базовая вероятность из TTC
+    if ttc < 5.0:
+        prob = 0.95
+    elif ttc < 15.0:
+        prob = 0.70
+    elif ttc < 60.0:
+        prob = 0.40
+    elif ttc < 300.0:
+        prob = 0.10
+    else:
+        prob = 0.01
+    
+    # Модулировать по скорости сближения
+    if closing_speed < 0.1:
+        prob *= 0.1
+    elif closing_speed > 5.0:
+        prob = min(0.99, prob * 1.5)
+    
+    # Модулировать по типу судна
+    prob = min(0.99, prob * _VESSEL_PROB_MUL[vessel_id])
+    
+    return risk, prob
+
+
+@njit(cache=True, fastmath=True)
+def _cri_kernel(dcpa, tcpa, theta, distance, speed, weights):
+    """
+    Нечёткий индекс риска столкновения CRI одной цели (компилированное ядро)
+    
+    CRI = a_CPA * sqrt(u(DCPA) * u(TCPA)) + a_θ * u(θ) + a_R * u(R) + a_V * u(V);
+    DCPA и TCPA - синусоидальный спад между границами, дистанция - квадратичный,
+    пеленг - косинус со смещением 19° на правый борт.
+    
+    Args:
+        dcpa: Дистанция кратчайшего сближения в метрах
+        tcpa: Время до точки кратчайшего сближения в секундах
+        theta: Пеленг цели 0-360°
+        distance: Текущее расстояние в метрах
+        speed: Скорость сближения м/с
+        weights: Веса (a_CPA, a_θ, a_R, a_V), сумма = 1
+    
+    Returns:
+        float: CRI 0-1
+    """
+    d1, d2 = _CRI_DCPA
+    if dcpa <= d1:
+        u_dcpa = 1.0
+    elif dcpa >= d2:
+        u_dcpa = 0.0
+    else:
+        u_dcpa = 0.5 - 0.5 * math.sin(math.pi / (d2 - d1) * (dcpa - 0.5 * (d1 + d2)))
+    
+    t1, t2 = _CRI_TCPA
+    if tcpa <= t1:
+        u_tcpa = 1.0
+    elif tcpa >= t2:
+        u_tcpa = 0.0
+    else:
+        u_tcpa = 0.5 - 0.5 * math.sin(math.pi / (t2 - t1) * (tcpa - 0.5 * (t1 + t2)))
+    
+    u_theta = 0.5 + 0.5 * math.cos(math.radians(theta) - _CRI_BEARING_BIAS)
+    
+    r1, r2 = _CRI_RANGE
+    if distance <= r1:
+        u_range = 1.0
+    elif distance >= r2:
+        u_range = 0.0
+    else:
+        u_range = ((r2 - distance) / (r2 - r1)) ** 2
+    
+    u_speed = min(max(speed / _CRI_SPEED_MAX, 0.0), 1.0)
+    
+    return (weights[0] * math.sqrt(u_dcpa * u_tcpa) + weights[1] * u_theta
+            + weights[2] * u_range + weights[3] * u_speed)
+
+
+@njit(cache=True)
+def _cri_score(distance, azimuth, ttc, closing_speed, weights):
+    """
+    Уровень риска и вероятность угрозы по модели CRI
+    
+    Скорость сближения известна только радиальная, поэтому сближающаяся цель
+    считается идущей прямо на нас: DCPA = 0, TCPA = TTC. Не сближающаяся
+    цель проходит на текущей дистанции.
+    
+    Returns:
+        tuple: (уровень риска 1-10, вероятность угрозы = CRI)
+    """
+    if closing_speed > 0.1:
+        cri = _cri_kernel(0.0, ttc, azimuth, distance, closing_speed, weights)
+    else:
+        cri = _cri_kernel(distance, _CRI_TCPA[1], azimuth, distance, 0.0, weights)
+    cri = min(max(cri, 0.0), 1.0)
+    return int(1 + 9 * cri), cri
+
+
+# Пакет меньше этого размера оценивается последовательно: запуск потоков
+# дороже самой оценки
+_PARALLEL_MIN_TARGETS = 8
+
+
+@njit(cache=True)
+def _score_row(distance, azimuth, closing_speed, vessel_id, cavitation,
+               use_cri, weights):
+    """
+    TTC, риск и вероятность угрозы одной цели пакета
+    
+    Args:
+        distance, azimuth, closing_speed, cavitation: Параметры цели
+        vessel_id: Код типа судна
+        use_cri: Модель CRI вместо ступеней TTC
+        weights: Веса CRI
+    
+    Returns:
+        tuple: (TTC, уровень риска 1-10, вероятность угрозы 0-1)
+    """
+    # Делитель не меньше 0.1 - деление безусловное (без 1/0 и ветвления),
+    # затем выбор значения для не сближающихся целей. Точное деление, а не
+    # умножение на обратную величину: TTC совпадает со скалярной версией
+    # и на границах ступеней
+    t = distance / max(closing_speed, 0.1)
+    t = t if closing_speed > 0.1 else TTC_SENTINEL
+    if use_cri:
+        r, p = _cri_score(distance, azimuth, t, closing_speed, weights)
+    else:
+        r, p = _score_kernel(distance, t, closing_speed, vessel_id, cavitation)
+    return t, r, p
+
+
+@njit(cache=True, parallel=True)
+def _score_batch(distance, azimuth, closing_speed, vessel_id, cavitation,
+                 use_cri, weights, ttc, risk, prob):
+    """
+    TTC, риск и вероятность угрозы для массива целей, параллельно по целям
+    
+    Число потоков задаётся NUMBA_NUM_THREADS.
+    
+    Args:
+        distance, azimuth, closing_speed, cavitation: Столбцы целей (float64)
+        vessel_id: Коды типов судов
+        use_cri: Модель CRI вместо ступеней TTC
+        weights: Веса CRI
+        ttc, risk, prob: Выходные столбцы
+    """
+    for i in prange(distance.shape[0]):
+        ttc[i], risk[i], prob[i] = _score_row(
+            distance[i], azimuth[i], closing_speed[i], vessel_id[i],
+            cavitation[i], use_cri, weights)
+
+
+@njit(cache=True)
+def _score_batch_serial(distance, azimuth, closing_speed, vessel_id, cavitation,
+                        use_cri, weights, ttc, risk, prob):
+    """То же, что _score_batch, последовательно - для малых пакетов"""
+    for i in range(distance.shape[0]):
+        ttc[i], risk[i], prob[i] = _score_row(
+            distance[i], azimuth[i], closing_speed[i], vessel_id[i],
+            cavitation[i], use_cri, weights)
+
+
+@dataclass(frozen=True, slots=True)
 class ThreatAssessment:
     """Полная оценка угрозы со всеми параметрами"""
     distance_m: float
     azimuth_deg: float
     elevation_deg: float
     closing_speed_mps: float
-    time_to_collision_s: float
+    time_to_collision_s: float  # TTC_SENTINEL (>= 1e8) - не сближается
     risk_level: int  # 1-10
     vessel_type: str
     threat_probability: float  # 0-1
-    recommendation: str
+    reco: RecoCode
+    
+    @property
+    def recommendation(self) -> str:
+        """Текст рекомендации для дайвера (форматируется при обращении)"""
+        return reco_to_str(self.reco)
 
 
 class ThreatAssessmentEngine:
@@ -52,10 +431,33 @@ class ThreatAssessmentEngine:
         'unknown': 0.7         # По умолчанию - среднее
     }
     
-    def __init__(self):
-        """Инициализация двигателя оценки"""
-        self.previous_assessment = None
-        self.assessment_history = []
+    def __init__(self, risk_model: str = 'ttc', cri_weights: Sequence[float] = CRI_WEIGHTS):
+        """
+        Инициализация двигателя оценки
+        
+        Args:
+            risk_model: 'ttc' - ступени TTC с поправками по типу судна,
+                        'cri' - нечёткий индекс риска столкновения (CRI)
+            cri_weights: Веса CRI (CPA, пеленг, дистанция, скорость)
+        
+        Raises:
+            ValueError: Неизвестная модель риска (не из RISK_MODELS)
+        """
+        if risk_model not in RISK_MODELS:
+            raise ValueError(f"Неизвестная модель риска {risk_model!r}, ожидается одна из {RISK_MODELS}")
+        self.risk_model = risk_model
+        self.cri_weights = np.asarray(cri_weights, dtype=np.float64)
+        
+        # Кольцевой буфер последних _HISTORY_LEN оценок
+        self._history = np.zeros(_HISTORY_LEN, dtype=THREAT_DTYPE).view(np.recarray)
+        self._hist_idx = 0
+        self._hist_fill = 0
+        
+        # Прогреть ядро оценки: компиляция (или загрузка из кэша) здесь,
+        # а не на первом кадре цикла управления
+        _score_kernel(100.0, 10.0, 1.0, UNKNOWN, 0.0)
+        if risk_model == 'cri':
+            _cri_score(100.0, 0.0, 10.0, 1.0, self.cri_weights)
     
     def assess_threat(self, fused_state, vessel_classification) -> ThreatAssessment:
         """
@@ -78,27 +480,22 @@ class ThreatAssessmentEngine:
         if closing_speed > 0.1:  # Движется к нам
             time_to_collision = distance / closing_speed
         else:
-            time_to_collision = float('inf')
-        
-        # Вычислить уровень риска (1-10 шкала)
-        risk_level = self._ttc_to_risk_level(time_to_collision)
+            time_to_collision = TTC_SENTINEL
         
-        # Модуляция риска в зависимости от типа судна
-        vessel_factor = self.VESSEL_DANGER_FACTORS.get(vessel_type, 0.7)
-        adjusted_risk = self._adjust_risk_by_vessel_type(
-            risk_level, vessel_type, closing_speed, 
-            vessel_classification.cavitation_level
-        )
-        
-        # Вероятность реальной угрозы
-        threat_probability = self._calculate_threat_probability(
-            distance, time_to_collision, closing_speed, vessel_type
-        )
+        # Уровень риска (1-10) и вероятность угрозы
+        if self.risk_model == 'cri':
+            adjusted_risk, threat_probability = _cri_score(
+                distance, azimuth, time_to_collision, closing_speed, self.cri_weights
+            )
+        else:
+            adjusted_risk, threat_probability = _score_kernel(
+                distance, time_to_collision, closing_speed,
+                VESSEL_IDS.get(vessel_type, UNKNOWN),
+                vessel_classification.cavitation_level
+            )
         
-        # Рекомендация для дайвера
-        recommendation = self._get_recommendation(
-            adjusted_risk, vessel_type, azimuth, time_to_collision
-        )
+        # Рекомендация для дайвера (текст - только по запросу)
+        reco = classify_reco(adjusted_risk, vessel_type, azimuth, time_to_collision)
         
         assessment = ThreatAssessment(
             distance_m=distance,
@@ -109,168 +506,99 @@ class ThreatAssessmentEngine:
             risk_level=adjusted_risk,
             vessel_type=vessel_type,
             threat_probability=threat_probability,
-            recommendation=recommendation
+            reco=reco
         )
         
-        self.assessment_history.append(assessment)
-        if len(self.assessment_history) > 10:
-            self.assessment_history.pop(0)
-        
-        self.previous_assessment = assessment
+        self._history[self._hist_idx] = (
+            distance, azimuth, elevation, closing_speed, time_to_collision,
+            adjusted_risk, vessel_type, threat_probability, reco
+        )
+        self._hist_idx = (self._hist_idx + 1) % _HISTORY_LEN
+        self._hist_fill = min(self._hist_fill + 1, _HISTORY_LEN)
         
         return assessment
     
-    def _ttc_to_risk_level(self, ttc: float) -> int:
+    @property
+    def previous_assessment(self) -> Optional[ThreatAssessment]:
+        """Последняя оценка из истории (None, пока оценок не было)"""
+        if self._hist_fill == 0:
+            return None
+        return ThreatAssessment(*self._history[(self._hist_idx - 1) % _HISTORY_LEN].item())
+    
+    @property
+    def assessment_history(self) -> List[ThreatAssessment]:
         """
-        Преобразовать время до столкновения в уровень риска 1-10
+        Последние оценки от старой к новой
         
-        Args:
-            ttc: Время до столкновения в секундах
+        Объекты ThreatAssessment собираются из кольцевого буфера только
+        при обращении, в цикле оценки хранятся лишь записи.
         
         Returns:
-            int: Уровень риска 1-10
+            list: До _HISTORY_LEN оценок
         """
-        if ttc < 5:
-            return 10
-        elif ttc < 15:
-            return 8
-        elif ttc < 30:
-            return 6
-        elif ttc < 60:
-            return 4
-        elif ttc < 120:
-            return 2
-        else:
-            return 1
+        start = (self._hist_idx - self._hist_fill) % _HISTORY_LEN
+        return [ThreatAssessment(*self._history[(start + k) % _HISTORY_LEN].item())
+                for k in range(self._hist_fill)]
     
-    def _adjust_risk_by_vessel_type(self, base_risk: int, vessel_type: str,
-                                   closing_speed: float, 
-                                   cavitation_level: float) -> int:
+    def assess_threats(self, targets: np.ndarray) -> List[ThreatAssessment]:
         """
-        Модулировать базовый уровень риска в зависимости от типа судна
-        
-        Args:
-            base_risk: Базовый уровень риска из TTC
-            vessel_type: Тип судна
-            closing_speed: Скорость сближения м/с
-            cavitation_level: Уровень кавитации 0-1
+        Пакетная оценка угрозы для всех целей одного обзора сонара
         
-        Returns:
-            int: Скорректированный уровень риска 1-10
-        """
-        risk = base_risk
-        
-        # Подводная лодка: +2 (максимально опасны!)
-        if vessel_type == 'submarine':
-            risk = min(10, risk + 2)
-            if cavitation_level > 0.3:
-                risk = 10  # Критично!
-        
-        # Корабль: +1 (опасны но медленны)
-        elif vessel_type == 'ship':
-            if closing_speed > 5:  # Более 5 м/с - необычно, мог ускориться
-                risk = min(10, risk + 1)
-        
-        # Лодка: +1 (быстры)
-        elif vessel_type == 'boat':
-            if closing_speed > 3:
-                risk = min(10, risk + 1)
-            if cavitation_level > 0.2:
-                risk = min(10, risk + 1)
-        
-        # ROV и AUV: -1 (менее опасны, предсказуемы)
-        elif vessel_type in ['rov', 'auv']:
-            risk = max(1, risk - 1)
-        
-        return max(1, min(risk, 10))
-    
-    def _calculate_threat_probability(self, distance: float, ttc: float,
-                                     closing_speed: float, 
-                                     vessel_type: str) -> float:
-        """
-        Вычислить вероятность реальной угрозы столкновения (0-1)
+        Те же TTC, риск и вероятность, что и assess_threat, но по столбцам
+        массива целей одним компилированным ядром (от _PARALLEL_MIN_TARGETS
+        целей - параллельно по потокам Numba); построчно формируются только
+        коды рекомендаций. История оценок не изменяется - она ведётся для
+        потока кадров основной цели в assess_threat.
         
         Args:
-            distance: Расстояние в метрах
-            ttc: Время до столкновения в секундах
-            closing_speed: Скорость сближения м/с
-            vessel_type: Тип судна
+            targets: Массив THREAT_INPUT_DTYPE (см. threat_inputs)
         
         Returns:
-            float: Вероятность угрозы 0-1
-        """
-        # Базовая вероятность из TTC
-        if ttc < 5:
-            prob = 0.95  # Критично - очень вероятно столкновение
-        elif ttc < 15:
-            prob = 0.70  # Высокий риск
-        elif ttc < 60:
-            prob = 0.40  # Средний риск
-        elif ttc < 300:
-            prob = 0.10  # Низкий риск
-        else:
-            prob = 0.01  # Минимальный риск
-        
-        # Модулировать по скорости сближения
-        if closing_speed < 0.1:
-            prob *= 0.1  # Движется от нас - маловероятно
-        elif closing_speed > 5:
-            prob = min(0.99, prob * 1.5)  # Быстро приближается
+            list: ThreatAssessment для каждой цели в порядке массива
         
-        # Модулировать по типу судна
-        if vessel_type == 'submarine':
-            prob = min(0.99, prob * 1.3)  # Подлодки опаснее
-        elif vessel_type in ['rov', 'auv']:
-            prob *= 0.5  # Другие ROV менее опасны
-        
-        return prob
-    
-    def _get_recommendation(self, risk_level: int, vessel_type: str,
-                           azimuth: float, ttc: float) -> str:
+        Raises:
+            ValueError: Код типа судна вне VESSEL_TYPES (ядро читает
+                        таблицы поправок по коду без проверки границ)
         """
-        Получить текстовую рекомендацию для дайвера
-        
-        Args:
-            risk_level: Уровень риска 1-10
-            vessel_type: Тип судна
-            azimuth: Азимут угрозы 0-360°
-            ttc: Время до столкновения
-        
-        Returns:
-            str: Рекомендация для дайвера
-        """
-        # Определить направление
-        if azimuth < 45 or azimuth > 315:
-            direction = "спереди"
-        elif azimuth < 135:
-            direction = "справа (старборд)"
-        elif azimuth < 225:
-            direction = "сзади"
-        else:
-            direction = "слева (порт)"
-        
-        # Определить вертикальное направление
-        if azimuth == 0:
-            vertical = "с поверхности"
-        elif azimuth == 180:
-            vertical = "снизу"
-        else:
-            vertical = ""
-        
-        # Сгенерировать рекомендацию в зависимости от риска
-        if risk_level >= 9:
-            return f"⚠️⚠️ КРИТИЧНО! {vessel_type.upper()} закрывается {direction} со скоростью! УХОДИТЕ НЕМЕДЛЕННО!"
-        elif risk_level >= 7:
-            if ttc < 10:
-                return f"🔴 ВЫСОКИЙ РИСК! {vessel_type} приближается {direction} (TTC {ttc:.1f}s). УХОДИТЕ!"
-            else:
-                return f"🟡 РИСК: {vessel_type} обнаружен {direction}. Подготовьтесь к манёвру."
-        elif risk_level >= 5:
-            return f"🟠 СРЕДНИЙ РИСК: {vessel_type} на расстоянии, {direction}. Мониторьте."
-        elif risk_level >= 3:
-            return f"🟡 НИЗКИЙ РИСК: {vessel_type} обнаружен {direction}. Будьте внимательны."
-        else:
-            return f"🟢 Судно обнаружено {direction}, но опасности нет."
+        vessel_id = targets['vessel_id']
+        if ((vessel_id < 0) | (vessel_id >= len(VESSEL_TYPES))).any():
+            raise ValueError(f"Код типа судна вне диапазона 0-{len(VESSEL_TYPES) - 1}")
+        
+        # Столбцы записи - непрерывными копиями для ядра
+        distance = targets['distance'].astype(np.float64)
+        azimuth = targets['azimuth'].astype(np.float64)
+        elevation = targets['elevation']
+        closing_speed = targets['closing_speed'].astype(np.float64)
+        cavitation = targets['cavitation'].astype(np.float64)
+        
+        # TTC, риск и вероятность - одним компилированным проходом,
+        # по целям параллельно для больших пакетов
+        n = len(targets)
+        ttc = np.empty(n, dtype=np.float64)
+        risk = np.empty(n, dtype=np.int32)
+        prob = np.empty(n, dtype=np.float64)
+        score = _score_batch if n >= _PARALLEL_MIN_TARGETS else _score_batch_serial
+        score(distance, azimuth, closing_speed, vessel_id, cavitation,
+              self.risk_model == 'cri', self.cri_weights, ttc, risk, prob)
+        
+        assessments = []
+        for i in range(len(targets)):
+            vessel_type = VESSEL_TYPES[vessel_id[i]]
+            assessments.append(ThreatAssessment(
+                distance_m=float(distance[i]),
+                azimuth_deg=float(azimuth[i]),
+                elevation_deg=float(elevation[i]),
+                closing_speed_mps=float(closing_speed[i]),
+                time_to_collision_s=float(ttc[i]),
+                risk_level=int(risk[i]),
+                vessel_type=vessel_type,
+                threat_probability=float(prob[i]),
+                reco=classify_reco(
+                    int(risk[i]), vessel_type, float(azimuth[i]), float(ttc[i])
+                )
+            ))
+        
+        return assessments
     
     def get_evasion_maneuver(self, threat_assessment: ThreatAssessment, 
                            robot_depth: float) -> Dict:
@@ -331,6 +659,52 @@ class ThreatAssessmentEngine:
             'speed_percent': speed,
             'urgency': urgency
         }
+    
+    def get_evasion_maneuvers(self, threat_assessments: Sequence[ThreatAssessment],
+                              robot_depth: float) -> Dict:
+        """
+        Манёвры уклонения для нескольких угроз одновременно (SoA)
+        
+        Та же логика, что и get_evasion_maneuver, но по столбцам азимута,
+        угла места и риска всех угроз сразу.
+        
+        Args:
+            threat_assessments: Оценки угроз (N штук)
+            robot_depth: Текущая глубина робота в метрах
+        
+        Returns:
+            dict: {
+                'desired_yaw': np.ndarray float32 (градусы),
+                'desired_pitch': np.ndarray float32 (градусы),
+                'desired_depth': np.ndarray float32 (метры),
+                'speed_percent': np.ndarray int8 (0-100),
+                'urgency': np.ndarray str ('slow', 'normal', 'fast', 'emergency')
+            }
+        """
+        n = len(threat_assessments)
+        azimuth = np.fromiter((t.azimuth_deg for t in threat_assessments), np.float32, n)
+        elevation = np.fromiter((t.elevation_deg for t in threat_assessments), np.float32, n)
+        risk = np.fromiter((t.risk_level for t in threat_assessments), np.int32, n)
+        
+        # Развернуться в противоположную угрозе сторону
+        evasion_yaw = (azimuth + 180) % 360
+        
+        # Угроза сверху - погрузиться на 20м, снизу - всплыть на 10м
+        above = elevation > 30
+        below = elevation < -30
+        evasion_pitch = np.where(above, -10, np.where(below, 10, 0)).astype(np.float32)
+        evasion_depth = (robot_depth + np.where(above, 20, np.where(below, -10, 0))).astype(np.float32)
+        
+        # Скорость и срочность по ступени риска
+        tier = np.clip((risk - 3) // 2, 0, 3)
+        
+        return {
+            'desired_yaw': evasion_yaw,
+            'desired_pitch': evasion_pitch,
+            'desired_depth': evasion_depth,
+            'speed_percent': _SPEED_TABLE[tier],
+            'urgency': _URGENCY_TABLE[tier]
+        }
 
 
 if __name__ == "__main__":